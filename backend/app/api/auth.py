@@ -2,114 +2,116 @@
 Authentication API endpoints.
 Handles user registration, login, and trial data import.
 """
-from datetime import datetime, timezone
-from typing import Dict, Any
+import asyncio
+import logging
+from typing import Dict, Any, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy.exc import IntegrityError
-from app.db.database import get_db
-from app.models.database import User, Event
+from app.db.database import get_db, get_sessionmaker
+from app.models.database import User
 from app.core.auth import (
     generate_user_id, hash_password, authenticate_user, 
-    create_user_token, generate_device_id
+    create_user_token, generate_device_id, revoke_token, invalidate_user_snapshot,
+    HASH_POOL
 )
-from app.core.dependencies import get_current_user_from_token
+from app.core.clock import db_timestamp, utc_now
+from app.core.dependencies import get_current_user_snapshot, get_progress_service, optional_bearer
+from app.core.responses import ModelJSONResponse
 from app.schemas import (
-    UserCreate, UserLogin, AuthResponse, ErrorResponse,
+    UserCreate, UserLogin, AuthData, AuthResponse, ErrorResponse,
     UserResponse, UserResponseWrapper
 )
+from app.services.event_logger import event_logger
 from app.services.progress_service import ProgressService
 
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+logger = logging.getLogger("wordmate.auth")
+
 
 @router.post("/register", response_model=AuthResponse)
 async def register_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
-) -> Dict[str, Any]:
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    session_factory: async_sessionmaker = Depends(get_sessionmaker),
+    progress_service: ProgressService = Depends(get_progress_service)
+) -> ModelJSONResponse:
     """
     Register a new user account.
-    Imports anonymous trial data if provided.
+    Imports anonymous trial data if provided: stats right away, word progress
+    and sessions in a background task after the response.
     """
+    now = utc_now()
     try:
-        # Check if email already exists
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already registered"
+        # Hash password (if provided)
+        password_hash = None
+        if user_data.password:
+            password_hash = await asyncio.get_running_loop().run_in_executor(
+                HASH_POOL, hash_password, user_data.password
             )
-        
-        # Generate user ID and hash password (if provided)
-        user_id = generate_user_id()
-        password_hash = hash_password(user_data.password) if user_data.password else None
         device_id = user_data.device_id or generate_device_id()
         
-        # Create user record
+        # Create user record; column timestamps match what the DB will hand back
+        stored_at = db_timestamp(now)
         db_user = User(
-            id=user_id,
+            external_id=generate_user_id(),
             email=user_data.email,
             username=user_data.username,
             password_hash=password_hash,
             device_id=device_id,
             grade=user_data.grade,
             registered_from_trial=bool(user_data.trial_data),
-            created_at=datetime.now(timezone.utc),
-            last_login_at=datetime.now(timezone.utc)
+            created_at=stored_at,
+            last_login_at=stored_at
         )
+        if user_data.trial_data and user_data.trial_data.get("stats"):
+            progress_service.apply_trial_stats(db_user, user_data.trial_data["stats"])
         
+        # Duplicate emails are rejected by the unique constraint (IntegrityError below),
+        # so a duplicate still pays for the Argon2id hash above; registration is rare
+        # enough that this is cheaper than an extra SELECT on every request
         db.add(db_user)
-        db.flush()  # Get the user ID without committing
+        await db.commit()
         
-        # Import trial data if provided
-        if user_data.trial_data:
-            progress_service = ProgressService()
-            await progress_service.import_trial_progress(
-                db=db,
-                user_id=user_id,
-                trial_data=user_data.trial_data
-            )
-        
-        # Log registration event
-        event = Event(
-            user_id=user_id,
-            event_type="registration",
-            event_data={
+        # Log registration event (written in the background)
+        event_logger.log(
+            "registration",
+            {
                 "method": "passwordless" if not user_data.password else "email",
                 "from_trial": bool(user_data.trial_data),
                 "grade": user_data.grade,
                 "device_id": device_id
-            }
+            },
+            user_id=db_user.id,
+            at=now
         )
-        db.add(event)
         
-        # Commit all changes
-        db.commit()
-        db.refresh(db_user)
+        # Trial history is not needed to issue the token; import it after responding
+        if user_data.trial_data:
+            background_tasks.add_task(
+                progress_service.import_trial_history,
+                session_factory, db_user.id, user_data.trial_data
+            )
         
         # Generate JWT token
         token = create_user_token(db_user)
         
-        # Prepare response data
-        user_response = UserResponse.from_orm(db_user)
-        
-        return {
-            "success": True,
-            "message": "Registration successful",
-            "data": {
-                "user": user_response.dict(),
-                "token": token,
-                "expires_in": 60 * 24 * 7  # 7 days in minutes
-            },
-            "timestamp": datetime.now()
-        }
+        return ModelJSONResponse(AuthResponse(
+            message="Registration successful",
+            data=AuthData(
+                user=UserResponse.model_validate(db_user, from_attributes=True),
+                token=token,
+                expires_in=60 * 24 * 7  # 7 days in minutes
+            ),
+            timestamp=now
+        ))
         
     except IntegrityError as e:
-        db.rollback()
+        await db.rollback()
         # Handle duplicate email constraint
         if "email" in str(e.orig):
             raise HTTPException(
@@ -122,7 +124,7 @@ async def register_user(
         )
     
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Registration failed: {str(e)}"
@@ -132,26 +134,36 @@ async def register_user(
 @router.post("/login", response_model=AuthResponse)
 async def login_user(
     login_data: UserLogin,
-    db: Session = Depends(get_db)
-) -> Dict[str, Any]:
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    session_factory: async_sessionmaker = Depends(get_sessionmaker)
+) -> ModelJSONResponse:
     """
     Authenticate user and return JWT token.
     Updates last login timestamp.
     """
+    now = utc_now()
     try:
-        # Debug logging
-        print(f"🔍 Login attempt: email={login_data.email}, username={login_data.username}, device_id={login_data.device_id}, has_password={bool(login_data.password)}")
+        # Credentials and identifiers (emails included) are never logged
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Login attempt has_email=%s has_username=%s has_device=%s has_password=%s",
+                bool(login_data.email), bool(login_data.username),
+                bool(login_data.device_id), bool(login_data.password)
+            )
         
         # Authenticate user with flexible parameters
-        user = authenticate_user(
+        user = await authenticate_user(
             db=db, 
             email=login_data.email, 
             username=login_data.username,
             password=login_data.password,
-            device_id=login_data.device_id
+            device_id=login_data.device_id,
+            background_tasks=background_tasks,
+            session_factory=session_factory
         )
         if not user:
-            print(f"❌ Authentication failed for: email={login_data.email}, username={login_data.username}")
+            logger.debug("Authentication failed")
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
@@ -159,45 +171,41 @@ async def login_user(
             )
         
         # Update last login timestamp
-        user.last_login_at = datetime.now(timezone.utc)
+        user.last_login_at = db_timestamp(now)
+        
+        await db.commit()
+        invalidate_user_snapshot(user.id)
         
-        # Log login event
+        # Log login event (written in the background)
         auth_method = "device" if login_data.device_id else "passwordless" if not login_data.password else "email"
-        event = Event(
-            user_id=user.id,
-            event_type="login",
-            event_data={
+        event_logger.log(
+            "login",
+            {
                 "method": auth_method,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "timestamp": now.isoformat(),
                 "device_id": login_data.device_id or user.device_id
-            }
+            },
+            user_id=user.id,
+            at=now
         )
-        db.add(event)
-        
-        db.commit()
-        db.refresh(user)
         
         # Generate JWT token
         token = create_user_token(user)
         
-        # Prepare response data
-        user_response = UserResponse.from_orm(user)
-        
-        return {
-            "success": True,
-            "message": "Login successful",
-            "data": {
-                "user": user_response.dict(),
-                "token": token,
-                "expires_in": 60 * 24 * 7  # 7 days in minutes
-            },
-            "timestamp": datetime.now()
-        }
+        return ModelJSONResponse(AuthResponse(
+            message="Login successful",
+            data=AuthData(
+                user=UserResponse.model_validate(user, from_attributes=True),
+                token=token,
+                expires_in=60 * 24 * 7  # 7 days in minutes
+            ),
+            timestamp=now
+        ))
         
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Login failed: {str(e)}"
@@ -206,19 +214,16 @@ async def login_user(
 
 @router.get("/me", response_model=UserResponseWrapper)
 async def get_current_user(
-    current_user: User = Depends(get_current_user_from_token)
-) -> Dict[str, Any]:
+    current_user: User = Depends(get_current_user_snapshot)
+) -> ModelJSONResponse:
     """
     Get current user information from JWT token.
     """
     try:
-        user_response = UserResponse.from_orm(current_user)
-        
-        return {
-            "success": True,
-            "data": user_response.dict(),
-            "timestamp": datetime.now()
-        }
+        return ModelJSONResponse(UserResponseWrapper(
+            data=UserResponse.model_validate(current_user, from_attributes=True),
+            timestamp=utc_now()
+        ))
         
     except Exception as e:
         raise HTTPException(
@@ -229,7 +234,7 @@ async def get_current_user(
 
 @router.post("/refresh")
 async def refresh_token(
-    current_user: User = Depends(get_current_user_from_token)
+    current_user: User = Depends(get_current_user_snapshot)
 ) -> Dict[str, Any]:
     """
     Refresh JWT token for authenticated user.
@@ -245,7 +250,7 @@ async def refresh_token(
                 "token": token,
                 "expires_in": 60 * 24 * 7  # 7 days in minutes
             },
-            "timestamp": datetime.now()
+            "timestamp": utc_now()
         }
         
     except Exception as e:
@@ -256,13 +261,20 @@ async def refresh_token(
 
 
 @router.post("/logout")
-async def logout_user() -> Dict[str, Any]:
+async def logout_user(
+    token: Optional[str] = Depends(optional_bearer)
+) -> Dict[str, Any]:
     """
     Logout user (client should discard token).
-    This is a placeholder for client-side token removal.
+    A valid presented token is also denied until it expires, but only by this
+    worker process: the denylist is in memory, so other workers and restarts
+    still accept the token.
     """
+    if token:
+        revoke_token(token)
+    
     return {
         "success": True,
         "message": "Logout successful. Please discard your token.",
-        "timestamp": datetime.now()
+        "timestamp": utc_now()
     }
@@ -2,38 +2,106 @@
 Authentication utilities.
 Handles JWT tokens, password hashing, and user verification.
 """
+import asyncio
+import os
 import secrets
-from datetime import datetime, timedelta
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from hashlib import blake2b
 from typing import Optional, Dict, Any
 
-from jose import JWTError, jwt
+from argon2 import PasswordHasher, Type
+from argon2.exceptions import InvalidHashError, VerificationError
+from cachetools import TTLCache
+import jwt
 from passlib.context import CryptContext
-from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import BackgroundTasks, HTTPException, status
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.core.config import settings
 from app.models.database import User
 
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hasher (Argon2id); hashes with other parameters are upgraded on login
+password_hasher = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_KIB,
+    parallelism=settings.ARGON2_PARALLELISM,
+    hash_len=32,
+    type=Type.ID,
+)
+
+# Legacy bcrypt context, only used to verify hashes created before Argon2id
+legacy_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+# Dedicated pool for CPU-bound password hashing so it never blocks the event loop.
+# Capped at half the cores: each Argon2id call holds ARGON2_MEMORY_KIB of RAM.
+HASH_POOL = ThreadPoolExecutor(
+    max_workers=max(1, (os.cpu_count() or 1) // 2),
+    thread_name_prefix="password-hash",
+)
+
+# Short-lived caches so bursts of requests skip the JWT HMAC check (keyed by
+# token digest) and the user lookup for read-only endpoints (keyed by user id).
+TOKEN_CACHE_TTL_SECONDS = 5
+token_payload_cache: TTLCache = TTLCache(maxsize=10_000, ttl=TOKEN_CACHE_TTL_SECONDS)
+user_snapshot_cache: TTLCache = TTLCache(maxsize=10_000, ttl=TOKEN_CACHE_TTL_SECONDS)
+
+# Tokens discarded via logout, mapped to their expiry. A plain dict rather than
+# a TTLCache: an evicted entry would make a revoked token valid again, so
+# entries only leave once the token itself has expired.
+REVOKED_TOKENS_MAX = 100_000
+revoked_tokens: Dict[bytes, float] = {}
 
 
 def generate_user_id() -> str:
-    """Generate unique user ID."""
-    timestamp = str(int(datetime.now().timestamp()))
+    """Generate unique public user ID (User.external_id)."""
+    timestamp = str(int(time.time()))
     random_part = secrets.token_hex(4)
     return f"user_{timestamp}_{random_part}"
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verify a password against its hash (Argon2id or legacy bcrypt)."""
+    if hashed_password.startswith(BCRYPT_PREFIXES):
+        return legacy_pwd_context.verify(plain_password, hashed_password)
+
+    try:
+        return password_hasher.verify(hashed_password, plain_password)
+    except (VerificationError, InvalidHashError):
+        return False
 
 
 def get_password_hash(password: str) -> str:
     """Generate password hash."""
-    return pwd_context.hash(password)
+    return password_hasher.hash(password)
+
+
+@lru_cache(maxsize=1)
+def _dummy_password_hash() -> str:
+    """Hash verified when no user matches, computed once on first use."""
+    return get_password_hash(secrets.token_urlsafe(16))
+
+
+def verify_dummy_password(password: str) -> bool:
+    """Run a full verification against the dummy hash; always False."""
+    verify_password(password, _dummy_password_hash())
+    return False
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a stored hash should be upgraded to the current Argon2id parameters."""
+    if hashed_password.startswith(BCRYPT_PREFIXES):
+        return True
+    try:
+        return password_hasher.check_needs_rehash(hashed_password)
+    except InvalidHashError:
+        return True
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -50,11 +118,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode = data.copy()
     
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        lifetime = int(expires_delta.total_seconds())
     else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+        lifetime = settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES * 60
     
-    to_encode.update({"exp": expire})
+    to_encode.setdefault("iat", int(time.time()))
+    to_encode["exp"] = to_encode["iat"] + lifetime
     
     encoded_jwt = jwt.encode(
         to_encode, 
@@ -65,6 +134,11 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def token_digest(token: str) -> bytes:
+    """Compact cache key for a token (avoids retaining the raw token)."""
+    return blake2b(token.encode(), digest_size=16).digest()
+
+
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Verify JWT token and return payload.
@@ -75,28 +149,113 @@ def verify_token(token: str) -> Optional[Dict[str, Any]]:
     Returns:
         Token payload if valid, None if invalid
     """
+    key = token_digest(token)
+    if key in revoked_tokens:
+        return None
+    
+    payload = token_payload_cache.get(key)
+    if payload is not None:
+        return None if _is_expired(payload) else payload
+    
     try:
+        # Signature, exp and required claims are all checked by PyJWT
         payload = jwt.decode(
             token, 
             settings.JWT_SECRET_KEY, 
-            algorithms=[settings.JWT_ALGORITHM]
+            algorithms=[settings.JWT_ALGORITHM],
+            options={"require": ["exp", "sub"]}
         )
-        
-        # Check if token is expired
-        exp = payload.get("exp")
-        if exp is None:
-            return None
-            
-        if datetime.utcnow().timestamp() > exp:
-            return None
-            
-        return payload
-        
-    except JWTError:
+    except jwt.InvalidTokenError:
         return None
+    
+    token_payload_cache[key] = payload
+    return payload
 
 
-def authenticate_user(db: Session, email: str = None, username: str = None, password: str = None, device_id: str = None) -> Optional[User]:
+def revoke_token(token: str) -> bool:
+    """
+    Deny a valid token for the rest of its lifetime and drop its cached state.
+    Returns False when the token is not valid (nothing to deny).
+    
+    Raises:
+        HTTPException: If the denylist is full of unexpired tokens
+    """
+    payload = verify_token(token)
+    if payload is None:
+        return False
+    
+    if len(revoked_tokens) >= REVOKED_TOKENS_MAX:
+        _prune_revoked_tokens()
+        if len(revoked_tokens) >= REVOKED_TOKENS_MAX:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Logout temporarily unavailable"
+            )
+    
+    key = token_digest(token)
+    revoked_tokens[key] = payload["exp"]
+    token_payload_cache.pop(key, None)
+    invalidate_user_snapshot(_subject_id(payload))
+    return True
+
+
+def invalidate_user_snapshot(user_id: Optional[int]) -> None:
+    """Drop the cached read-only snapshot of a user after it changes."""
+    user_snapshot_cache.pop(user_id, None)
+
+
+def _is_expired(payload: Dict[str, Any]) -> bool:
+    """Check a decoded payload's exp claim against the current time."""
+    exp = payload.get("exp")
+    return exp is None or time.time() > exp
+
+
+def _prune_revoked_tokens() -> None:
+    """Forget revoked tokens that have expired on their own."""
+    now = time.time()
+    for key in [key for key, exp in revoked_tokens.items() if exp < now]:
+        del revoked_tokens[key]
+
+
+# Credential lookups built once; only the bound value changes per login.
+# Only the credential columns are fetched; the full row is loaded after verification.
+# idx_email/idx_username already carry the primary key, and a covering index
+# over password_hash would copy every hash into a second B-tree for no gain,
+# since a successful login reads the full row right after anyway.
+_credentials = select(User.id, User.password_hash, User.device_id)
+CREDENTIAL_LOOKUPS = {
+    "email": _credentials.where(User.email == bindparam("value")).limit(1),
+    "username": _credentials.where(User.username == bindparam("value")).limit(1),
+    "device_id": _credentials.where(User.device_id == bindparam("value")).limit(1),
+}
+
+
+async def rehash_password(
+    session_factory: async_sessionmaker, user_id: int, old_hash: str, password: str
+) -> None:
+    """
+    Store a fresh Argon2id hash for a verified password.
+    Skipped if the stored hash changed in the meantime.
+    """
+    new_hash = await asyncio.get_running_loop().run_in_executor(HASH_POOL, get_password_hash, password)
+    async with session_factory() as db:
+        await db.execute(
+            update(User)
+            .where(User.id == user_id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
+        await db.commit()
+
+
+async def authenticate_user(
+    db: AsyncSession,
+    email: str = None,
+    username: str = None,
+    password: str = None,
+    device_id: str = None,
+    background_tasks: Optional[BackgroundTasks] = None,
+    session_factory: Optional[async_sessionmaker] = None,
+) -> Optional[User]:
     """
     Authenticate user by email/username and password, or by device_id for passwordless auth.
     
@@ -106,41 +265,68 @@ def authenticate_user(db: Session, email: str = None, username: str = None, pass
         username: Username (optional)
         password: Plain text password (optional)
         device_id: Device ID for passwordless auth (optional)
+        background_tasks: Where to schedule rehashing of outdated hashes (optional)
+        session_factory: Session factory the rehash task opens its own session from
     
     Returns:
         User object if authentication successful, None otherwise
     """
-    user = None
+    # Use the first identifier given, in priority order
+    lookup = next(
+        ((field, value) for field, value in (("email", email), ("username", username), ("device_id", device_id)) if value),
+        None
+    )
+    if lookup is None:
+        return None
     
-    # Find user by email, username, or device_id
-    if email:
-        user = db.query(User).filter(User.email == email).first()
-    elif username:
-        user = db.query(User).filter(User.username == username).first()
-    elif device_id:
-        user = db.query(User).filter(User.device_id == device_id).first()
+    field, value = lookup
+    row = (await db.execute(CREDENTIAL_LOOKUPS[field], {"value": value})).first()
     
-    if not user:
+    if not row:
+        # Spend the same Argon2id work as a wrong password so response time
+        # does not reveal whether the account exists
+        if password:
+            await asyncio.get_running_loop().run_in_executor(
+                HASH_POOL, verify_dummy_password, password
+            )
         return None
     
+    authenticated = False
+    
     # For passwordless auth (device_id provided), skip password verification
-    if device_id and user.device_id == device_id:
-        return user
+    if device_id and row.device_id == device_id:
+        authenticated = True
         
     # For password auth, verify password if provided
-    if password and user.password_hash:
-        if not verify_password(password, user.password_hash):
-            return None
-        return user
+    elif password and row.password_hash:
+        authenticated = await asyncio.get_running_loop().run_in_executor(
+            HASH_POOL, verify_password, password, row.password_hash
+        )
+        # Migrate legacy bcrypt hashes / outdated parameters after the response
+        if authenticated and background_tasks is not None and password_needs_rehash(row.password_hash):
+            background_tasks.add_task(rehash_password, session_factory, row.id, row.password_hash, password)
     
     # If user has no password set (passwordless account), allow access with email/username
-    if not user.password_hash and (email or username):
-        return user
+    elif not row.password_hash and (email or username):
+        authenticated = True
     
-    return None
+    if not authenticated:
+        return None
+    
+    # Second SELECT, by primary key: the credential query returned plain rows,
+    # so the User entity is not in the identity map yet. Failed logins stop above.
+    return await db.get(User, row.id)
+
+
+def _subject_id(payload: Dict[str, Any]) -> Optional[int]:
+    """Internal user ID from a token's sub claim; None if it is not one."""
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
 
 
-def get_current_user_id(token: str) -> str:
+def get_current_user_id(token: str) -> int:
     """
     Extract user ID from JWT token.
     
@@ -148,7 +334,7 @@ def get_current_user_id(token: str) -> str:
         token: JWT token string
     
     Returns:
-        User ID string
+        Internal user ID
     
     Raises:
         HTTPException: If token is invalid or user ID not found
@@ -163,7 +349,8 @@ def get_current_user_id(token: str) -> str:
     if payload is None:
         raise credentials_exception
     
-    user_id: str = payload.get("sub")
+    # Tokens issued before users had numeric IDs fail here and must log in again
+    user_id = _subject_id(payload)
     if user_id is None:
         raise credentials_exception
         
@@ -181,10 +368,10 @@ def create_user_token(user: User) -> str:
         JWT token string
     """
     token_data = {
-        "sub": user.id,  # Subject (user ID)
+        "sub": str(user.id),  # Subject (internal user ID; JWT requires a string)
         "email": user.email,
         "username": user.username,
-        "iat": datetime.utcnow().timestamp(),  # Issued at
+        "iat": int(time.time()),  # Issued at
     }
     
     return create_access_token(token_data)
@@ -205,6 +392,6 @@ def hash_password(password: str) -> str:
 
 def generate_device_id() -> str:
     """Generate a unique device ID."""
-    timestamp = str(int(datetime.now().timestamp()))
+    timestamp = str(int(time.time()))
     random_part = secrets.token_hex(8)
     return f"device_{timestamp}_{random_part}"
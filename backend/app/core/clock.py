@@ -0,0 +1,57 @@
+"""
+Clock helpers for response and column timestamps, and for parsing
+timestamps sent by clients.
+"""
+from datetime import date, datetime, timezone
+from typing import Any, Optional
+
+import ciso8601
+
+
+def utc_now() -> datetime:
+    """Current timezone-aware UTC time; serialized natively by orjson."""
+    return datetime.now(timezone.utc)
+
+
+def db_timestamp(moment: datetime) -> datetime:
+    """
+    Naive UTC value as a DATETIME column stores it (whole seconds).
+    Lets a handler return exactly what later reads of the row will return.
+    """
+    return moment.astimezone(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def db_now() -> datetime:
+    """
+    Current time as a DATETIME column stores it. Python-side default for
+    the created/updated columns, so inserts carry the value and the ORM
+    never has to read it back.
+    """
+    return db_timestamp(utc_now())
+
+
+def parse_client_date(value: Any) -> Optional[date]:
+    """Date from an ISO 8601 date or datetime string; None if unparseable."""
+    if not value:
+        return None
+    
+    try:
+        if isinstance(value, str):
+            return ciso8601.parse_datetime(value).date()
+        return value
+    except (ValueError, AttributeError):
+        return None
+
+
+def parse_client_datetime(value: Any) -> Optional[datetime]:
+    """Datetime from an ISO 8601 string; None if unparseable."""
+    if not value:
+        return None
+    
+    try:
+        if isinstance(value, str):
+            # Parses "Z" and offsets directly, in C
+            return ciso8601.parse_datetime(value)
+        return value
+    except (ValueError, AttributeError):
+        return None
@@ -3,7 +3,8 @@ Application configuration using Pydantic settings.
 Handles environment variables and validation.
 """
 import os
-from typing import List, Optional
+from functools import cached_property
+from typing import Optional, Tuple
 from pydantic import Field, field_validator, ConfigDict
 from pydantic_settings import BaseSettings
 
@@ -15,6 +16,7 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     PROJECT_NAME: str = "WordMate API"
     DEBUG: bool = False
+    APP_ENV: str = "production"  # "dev" and "test" enable strict ORM loading checks
     
     # Database
     MYSQL_HOST: str = Field(default="localhost", description="MySQL host")
@@ -23,32 +25,41 @@ class Settings(BaseSettings):
     MYSQL_PASSWORD: str = Field(default="test_password", description="MySQL password")
     MYSQL_DATABASE: str = Field(default="wordmate", description="MySQL database name")
     
-    @property
+    @cached_property
     def DATABASE_URL(self) -> str:
         """Construct MySQL database URL."""
         return (
-            f"mysql+pymysql://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}"
+            f"mysql+asyncmy://{self.MYSQL_USER}:{self.MYSQL_PASSWORD}"
             f"@{self.MYSQL_HOST}:{self.MYSQL_PORT}/{self.MYSQL_DATABASE}"
             f"?charset=utf8mb4"
         )
     
+    # Connection pool, per worker process. Keep workers * (size + overflow)
+    # below the server's max_connections.
+    DB_POOL_SIZE: int = 32
+    DB_MAX_OVERFLOW: int = 32
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Under MySQL's wait_timeout
+    
     # JWT Configuration
     JWT_SECRET_KEY: str = Field(default="test_jwt_secret_key_not_for_production", description="JWT secret key")
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
     
+    # Password hashing (Argon2id; defaults follow the OWASP 46 MiB profile)
+    ARGON2_MEMORY_KIB: int = 46 * 1024
+    ARGON2_TIME_COST: int = 2
+    ARGON2_PARALLELISM: int = 1
+    
     # CORS
     BACKEND_CORS_ORIGINS: str = Field(
         default="http://localhost:3000,http://localhost:5173,http://localhost:5174",
         description="CORS allowed origins (comma-separated string)"
     )
     
-    @property
-    def CORS_ORIGINS_LIST(self) -> List[str]:
-        """Convert CORS origins string to list."""
-        if isinstance(self.BACKEND_CORS_ORIGINS, str):
-            return [origin.strip() for origin in self.BACKEND_CORS_ORIGINS.split(",")]
-        return self.BACKEND_CORS_ORIGINS
+    @cached_property
+    def CORS_ORIGINS_LIST(self) -> Tuple[str, ...]:
+        """CORS origins, parsed once on first access."""
+        return tuple(origin.strip() for origin in self.BACKEND_CORS_ORIGINS.split(","))
     
     # Payment Configuration
     ALIPAY_APP_ID: Optional[str] = None
@@ -65,12 +76,25 @@ class Settings(BaseSettings):
     RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_REQUESTS_PER_MINUTE: int = 60
     
+    # Redis (optional). When set, user progress stats are buffered there and
+    # written to MySQL in batches instead of one UPDATE per sync.
+    REDIS_URL: Optional[str] = None
+    USER_STATS_FLUSH_SECONDS: float = 10.0
+    USER_STATS_FLUSH_BATCH: int = 500
+    
+    # Events are queued in memory and written in batches of up to
+    # EVENT_FLUSH_BATCH, at most EVENT_FLUSH_SECONDS after the first one
+    EVENT_QUEUE_SIZE: int = 10000
+    EVENT_FLUSH_SECONDS: float = 1.0
+    EVENT_FLUSH_BATCH: int = 500
+    
     # Logging
     LOG_LEVEL: str = "INFO"
     
     model_config = ConfigDict(
         env_file=os.environ.get("ENV_FILE", ".env"),
-        case_sensitive=True
+        case_sensitive=True,
+        frozen=True
     )
 
 
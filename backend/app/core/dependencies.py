@@ -1,28 +1,50 @@
 """
 FastAPI dependencies for authentication and authorization.
 """
-from fastapi import Depends, HTTPException, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
 from app.models.database import User
-from app.core.auth import get_current_user_id
+from app.core.auth import get_current_user_id, user_snapshot_cache
+from app.services.progress_service import ProgressService, progress_service
+
+
+USER_COLUMNS = tuple(attr.key for attr in User.__mapper__.column_attrs)
+
+
+# Bearer token extraction; async so FastAPI calls them inline rather than in
+# the threadpool it uses for plain functions
+async def optional_bearer(request: Request) -> Optional[str]:
+    """Raw token from an "Authorization: Bearer <token>" header, if present."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if token and scheme.lower() == "bearer":
+        return token
+    return None
 
 
-# HTTP Bearer token scheme
-security = HTTPBearer()
+async def bearer(token: Optional[str] = Depends(optional_bearer)) -> str:
+    """Raw bearer token; rejects requests without one."""
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token
 
 
 async def get_current_user_from_token(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    token: str = Depends(bearer),
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """
     Get current user from JWT token.
     
     Args:
-        credentials: Bearer token credentials
+        token: Raw bearer token
         db: Database session
     
     Returns:
@@ -33,16 +55,17 @@ async def get_current_user_from_token(
     """
     try:
         # Extract user ID from token
-        user_id = get_current_user_id(credentials.credentials)
+        user_id = get_current_user_id(token)
         
         # Get user from database
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
+        user_snapshot_cache[user_id] = {key: getattr(user, key) for key in USER_COLUMNS}
         return user
         
     except HTTPException:
@@ -55,19 +78,43 @@ async def get_current_user_from_token(
         )
 
 
+async def get_current_user_snapshot(
+    token: str = Depends(bearer),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """
+    Get a read-only copy of the current user, served from a short-lived cache.
+    
+    The returned object is not attached to any session: use it for responses
+    only, and depend on get_current_user_from_token for anything that writes.
+    
+    Raises:
+        HTTPException: If token is invalid or user not found
+    """
+    snapshot = user_snapshot_cache.get(get_current_user_id(token))
+    if snapshot is not None:
+        return User(**snapshot)
+    return await get_current_user_from_token(token, db)
+
+
 async def get_current_user_id_from_token(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> str:
+    token: str = Depends(bearer)
+) -> int:
     """
     Extract user ID from JWT token.
     
     Args:
-        credentials: Bearer token credentials
+        token: Raw bearer token
     
     Returns:
-        User ID string
+        Internal user ID
     
     Raises:
         HTTPException: If token is invalid
     """
-    return get_current_user_id(credentials.credentials)
+    return get_current_user_id(token)
+
+
+async def get_progress_service() -> ProgressService:
+    """The shared ProgressService; overridable in tests."""
+    return progress_service
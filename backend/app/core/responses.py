@@ -0,0 +1,34 @@
+"""
+Response classes shared by the application.
+"""
+from typing import Any
+
+import orjson
+import pydantic_core
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import BaseModel
+
+
+class UTCJSONResponse(ORJSONResponse):
+    """
+    orjson response that renders UTC datetimes with a "Z" suffix.
+    Matches Pydantic's output so every envelope timestamp has one format.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z,
+        )
+
+
+class ModelJSONResponse(Response):
+    """
+    Response rendered straight from an already-built response model.
+    Returning it from a route skips FastAPI's dump/re-validate/serialize pass
+    over response_model; pydantic-core writes the JSON bytes in one step.
+    """
+    media_type = "application/json"
+
+    def render(self, content: BaseModel) -> bytes:
+        return pydantic_core.to_json(content)
@@ -1,56 +1,109 @@
 """
 Database connection and session management.
-Uses SQLAlchemy with MySQL connection pooling.
+Uses async SQLAlchemy (asyncmy driver) with MySQL connection pooling.
 """
-from typing import Generator
-from sqlalchemy import create_engine, event
-from sqlalchemy.orm import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.pool import QueuePool
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import AsyncGenerator, Iterator, List, Tuple
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import ORMExecuteState, Session, declarative_base, raiseload
 
 from app.core.config import settings
 
+# Session settings applied by the driver as part of connecting, in one statement
+MYSQL_INIT_COMMAND = (
+    "SET time_zone = '+00:00', "              # Timezone to UTC
+    "sql_mode = 'STRICT_TRANS_TABLES', "      # Strict mode
+    "innodb_lock_wait_timeout = 5"            # Fail fast on InnoDB lock waits
+)
+
 # Create database engine with optimized settings
-engine = create_engine(
+engine = create_async_engine(
     settings.DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
     pool_pre_ping=True,  # Validates connections before use
-    pool_recycle=3600,   # Recycle connections every hour
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    # Hand out the most recently returned connection first; idle extras
+    # age out through pool_recycle instead of all staying lukewarm
+    pool_use_lifo=True,
     echo=settings.DEBUG,  # Log SQL queries in debug mode
+    # Compiled statement cache shared across requests. asyncmy has no
+    # server-side prepared statements, so this LRU is where per-request SQL
+    # compilation is saved; keep it bounded rather than a plain dict.
+    query_cache_size=1200,
+    connect_args={"init_command": MYSQL_INIT_COMMAND},
 )
 
-# Configure session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Configure session factory; objects stay loaded after commit so responses
+# can be serialized without a reload round-trip
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+HEALTH_CHECK_QUERY = text("SELECT 1 as test")
+
+# Health checks reuse a recent SELECT 1 result instead of probing per request
+HEALTH_CACHE_SECONDS = 2.0
+HEALTH_REFRESH_SECONDS = 5.0
+_last_health: Tuple[float, bool] = (float("-inf"), False)
 
 # Base class for database models
 Base = declarative_base()
 
 
-def get_db() -> Generator[Session, None, None]:
+# In dev/test, relationship loads the query did not ask for raise instead of
+# silently issuing one SELECT per parent (N+1)
+STRICT_LOADING_ENVS = {"dev", "test"}
+
+
+def _raise_on_implicit_loads(execute_state: ORMExecuteState) -> None:
+    """Default ORM selects to raiseload("*") unless they set loader options."""
+    if (
+        execute_state.is_select
+        and not execute_state.is_relationship_load
+        and not execute_state.is_column_load
+        and not execute_state.statement._with_options
+    ):
+        # sql_only: many-to-one hits in the identity map are still allowed
+        execute_state.statement = execute_state.statement.options(raiseload("*", sql_only=True))
+
+
+if settings.APP_ENV in STRICT_LOADING_ENVS:
+    event.listen(Session, "do_orm_execute", _raise_on_implicit_loads)
+
+
+@contextmanager
+def count_queries(bind: Engine) -> Iterator[List[str]]:
+    """Collect the SQL statements executed on an engine inside the block."""
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(bind, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(bind, "before_cursor_execute", record)
+
+
+def get_sessionmaker() -> async_sessionmaker:
+    """
+    Session factory dependency for work that outlives the request
+    (background tasks open their own sessions from it).
+    """
+    return SessionLocal
+
+
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
     """
     Database dependency for FastAPI.
     Provides a database session and ensures proper cleanup.
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
-
-
-# Event listeners for connection optimization
-@event.listens_for(engine, "connect")
-def set_mysql_pragma(dbapi_connection, connection_record):
-    """Set MySQL connection parameters for optimal performance."""
-    with dbapi_connection.cursor() as cursor:
-        # Set timezone to UTC
-        cursor.execute("SET time_zone = '+00:00'")
-        # Enable strict mode
-        cursor.execute("SET sql_mode = 'STRICT_TRANS_TABLES'")
-        # Optimize for InnoDB
-        cursor.execute("SET innodb_lock_wait_timeout = 5")
 
 
 async def test_database_connection() -> bool:
@@ -59,10 +112,35 @@ async def test_database_connection() -> bool:
     Returns True if connection is successful.
     """
     try:
-        from sqlalchemy import text
-        with engine.connect() as connection:
-            result = connection.execute(text("SELECT 1 as test"))
+        async with engine.connect() as connection:
+            result = await connection.execute(HEALTH_CHECK_QUERY)
             return result.scalar() == 1
     except Exception as e:
         print(f"Database connection test failed: {e}")
         return False
+
+
+async def check_database_health() -> bool:
+    """Run the connectivity check and record the result for get_database_health()."""
+    global _last_health
+    ok = await test_database_connection()
+    _last_health = (time.monotonic(), ok)
+    return ok
+
+
+async def get_database_health() -> bool:
+    """
+    Database liveness for the health endpoint.
+    Served from the last check when it is under HEALTH_CACHE_SECONDS old.
+    """
+    checked_at, ok = _last_health
+    if time.monotonic() - checked_at < HEALTH_CACHE_SECONDS:
+        return ok
+    return await check_database_health()
+
+
+async def refresh_database_health() -> None:
+    """Background loop keeping the cached health result fresh."""
+    while True:
+        await check_database_health()
+        await asyncio.sleep(HEALTH_REFRESH_SECONDS)
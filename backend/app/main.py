@@ -2,21 +2,31 @@
 FastAPI main application.
 Sets up routing, middleware, and application lifecycle.
 """
-from contextlib import asynccontextmanager
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, Request, status
+import orjson
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 
+from app.core.clock import utc_now
 from app.core.config import settings
-from app.db.database import test_database_connection
+from app.core.responses import UTCJSONResponse
+from app.db.database import SessionLocal, check_database_health, get_database_health, refresh_database_health
+from app.services.event_logger import event_logger
+from app.services.user_stats_cache import user_stats_cache
 from app.api import auth
 from app.schemas import HealthCheck
 
 
+logging.basicConfig(level=settings.LOG_LEVEL)
+logger = logging.getLogger("wordmate")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager."""
@@ -24,16 +34,33 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting WordMate API...")
     
     # Test database connection
-    db_connected = await test_database_connection()
+    db_connected = await check_database_health()
     if not db_connected:
         print("❌ Database connection failed!")
     else:
         print("✅ Database connected successfully")
     
+    # Keep /health answers warm so probes never wait on the database
+    background = [asyncio.create_task(refresh_database_health())]
+    
+    # Write queued events in batches
+    background.append(asyncio.create_task(event_logger.run_flusher(SessionLocal)))
+    
+    # Write buffered user stats back to MySQL
+    if user_stats_cache is not None:
+        background.append(asyncio.create_task(user_stats_cache.run_flusher(SessionLocal)))
+    
     yield
     
     # Shutdown
     print("🛑 Shutting down WordMate API...")
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if user_stats_cache is not None:
+        await user_stats_cache.flush(SessionLocal)
+    await event_logger.drain(SessionLocal)
 
 
 # Create FastAPI application
@@ -44,6 +71,7 @@ app = FastAPI(
     openapi_url=f"{settings.API_V1_STR}/openapi.json" if settings.DEBUG else None,
     docs_url=f"{settings.API_V1_STR}/docs" if settings.DEBUG else None,
     redoc_url=f"{settings.API_V1_STR}/redoc" if settings.DEBUG else None,
+    default_response_class=UTCJSONResponse,
     lifespan=lifespan
 )
 
@@ -65,7 +93,7 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Handle HTTP exceptions with consistent format."""
-    return JSONResponse(
+    return UTCJSONResponse(
         status_code=exc.status_code,
         content={
             "success": False,
@@ -73,7 +101,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
                 "code": f"HTTP_{exc.status_code}",
                 "message": exc.detail
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": utc_now()
         }
     )
 
@@ -89,7 +117,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
             "type": error["type"]
         })
     
-    return JSONResponse(
+    return UTCJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={
             "success": False,
@@ -98,7 +126,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
                 "message": "Request validation failed",
                 "details": errors
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": utc_now()
         }
     )
 
@@ -106,9 +134,9 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """Handle unexpected exceptions."""
-    print(f"Unexpected error: {exc}")
+    logger.exception("Unexpected error on %s %s", request.method, request.url.path, exc_info=exc)
     
-    return JSONResponse(
+    return UTCJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={
             "success": False,
@@ -116,7 +144,7 @@ async def general_exception_handler(request: Request, exc: Exception):
                 "code": "INTERNAL_ERROR",
                 "message": "An unexpected error occurred" if not settings.DEBUG else str(exc)
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": utc_now()
         }
     )
 
@@ -125,7 +153,7 @@ async def general_exception_handler(request: Request, exc: Exception):
 @app.get("/health", response_model=HealthCheck, tags=["health"])
 async def health_check():
     """Health check endpoint for monitoring."""
-    db_connected = await test_database_connection()
+    db_connected = await get_database_health()
     
     return HealthCheck(
         status="healthy" if db_connected else "unhealthy",
@@ -134,17 +162,20 @@ async def health_check():
     )
 
 
-# Root endpoint
+# Root endpoint; everything but the timestamp is fixed, so it is encoded once
+ROOT_JSON_PREFIX = orjson.dumps({
+    "message": "WordMate API",
+    "version": "1.0.0",
+    "docs": f"{settings.API_V1_STR}/docs" if settings.DEBUG else "Documentation disabled in production",
+    "health": "/health",
+})[:-1] + b',"timestamp":'
+
+
 @app.get("/")
-async def root():
+async def root() -> Response:
     """Root endpoint with API information."""
-    return {
-        "message": "WordMate API",
-        "version": "1.0.0",
-        "docs": f"{settings.API_V1_STR}/docs" if settings.DEBUG else "Documentation disabled in production",
-        "health": "/health",
-        "timestamp": datetime.now().isoformat()
-    }
+    timestamp = orjson.dumps(utc_now(), option=orjson.OPT_UTC_Z)
+    return Response(ROOT_JSON_PREFIX + timestamp + b"}", media_type="application/json")
 
 
 # API routes
@@ -2,25 +2,65 @@
 SQLAlchemy database models.
 Matches the optimized MySQL schema with auto-increment IDs.
 """
-from datetime import date, datetime
-from decimal import Decimal
-from typing import Optional
+from datetime import date, datetime, timedelta
+from typing import Any, Optional
 
+import orjson
+import zstandard
 from sqlalchemy import (
     Column, String, Integer, BigInteger, Boolean, DECIMAL, Date, 
-    DateTime, Text, JSON, Enum as SQLEnum, ForeignKey, Index
+    DateTime, Text, JSON, Enum as SQLEnum, ForeignKey, Index, SmallInteger, event,
+    LargeBinary
 )
+from sqlalchemy.dialects import mysql
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
 
+from app.core.clock import db_now
 from app.db.database import Base
 
+# Surrogate user key. SQLite only auto-increments INTEGER primary keys.
+USER_ID = BigInteger().with_variant(Integer, "sqlite")
+
+# Vocabulary keys ("younger_1") are plain ASCII: one byte per character in
+# every index and temp table, compared bytewise instead of by collation
+WORD_ID = String(100).with_variant(mysql.VARCHAR(100, charset="ascii", collation="ascii_bin"), "mysql")
+
+# Tenths of a point in one unsigned byte on MySQL
+FIXED_POINT = SmallInteger().with_variant(mysql.TINYINT(unsigned=True), "mysql")
+
+# Event payloads are stored as zstd-compressed JSON. Payloads that do not
+# shrink, and rows written by SQL procedures, stay as plain JSON bytes;
+# the frame magic tells the two apart on read.
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+_zstd_compressor = zstandard.ZstdCompressor(level=3)
+_zstd_decompressor = zstandard.ZstdDecompressor()
+
+
+def pack_event_data(data: Any) -> Optional[bytes]:
+    """Serialize an event payload, compressed when that makes it smaller."""
+    if data is None:
+        return None
+    raw = orjson.dumps(data)
+    packed = _zstd_compressor.compress(raw)
+    return packed if len(packed) < len(raw) else raw
+
+
+def unpack_event_data(payload: Optional[bytes]) -> Any:
+    """Inverse of pack_event_data."""
+    if payload is None:
+        return None
+    if payload[:4] == ZSTD_MAGIC:
+        payload = _zstd_decompressor.decompress(payload)
+    return orjson.loads(payload)
+
 
 class User(Base):
     """User model - registered users only."""
     __tablename__ = "users"
     
-    id = Column(String(50), primary_key=True)
+    id = Column(USER_ID, primary_key=True, autoincrement=True)
+    external_id = Column(String(50), unique=True, nullable=False)  # Public ID used by the API
     email = Column(String(255), unique=True, nullable=False)
     username = Column(String(100), nullable=False)
     password_hash = Column(String(255), nullable=True)  # Made optional for passwordless auth
@@ -42,19 +82,25 @@ class User(Base):
     plan_expires_at = Column(DateTime, nullable=True)
     
     # Timestamps
-    created_at = Column(DateTime, server_default=func.now())
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime, default=db_now)
+    updated_at = Column(DateTime, default=db_now, onupdate=db_now)
     last_login_at = Column(DateTime, nullable=True)
     
-    # Relationships
-    user_words = relationship("UserWord", back_populates="user", cascade="all, delete-orphan")
-    sessions = relationship("Session", back_populates="user", cascade="all, delete-orphan")
-    payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan")
-    events = relationship("Event", back_populates="user")
+    # Relationships. Users are loaded on every authenticated request, so the
+    # collections are never eager; query sites that need children add
+    # selectinload(User.user_words) etc. to get one extra query, not N.
+    user_words = relationship("UserWord", back_populates="user", cascade="all, delete-orphan", lazy="select")
+    sessions = relationship("Session", back_populates="user", cascade="all, delete-orphan", lazy="select")
+    payments = relationship("Payment", back_populates="user", cascade="all, delete-orphan", lazy="select")
+    events = relationship(
+        "Event", back_populates="user", lazy="select",
+        primaryjoin="User.id == foreign(Event.user_id)",
+    )
     
     # Indexes defined in schema creation
+    # email and external_id are already indexed by their unique constraints
     __table_args__ = (
-        Index("idx_email", "email"),
+        Index("idx_username", "username"),
         Index("idx_device_id", "device_id"),
         Index("idx_plan_expires", "plan_expires_at"),
         Index("idx_last_active", "last_active_date"),
@@ -66,13 +112,14 @@ class UserWord(Base):
     """User word progress - spaced repetition data."""
     __tablename__ = "user_words"
     
-    user_id = Column(String(50), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
-    word_id = Column(String(100), primary_key=True)  # References JSON vocabulary
+    user_id = Column(USER_ID, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    word_id = Column(WORD_ID, primary_key=True)  # References JSON vocabulary
     
-    # Spaced repetition core data
-    mastery_level = Column(DECIMAL(3, 1), default=0.0)  # 0.0 to 5.0
+    # Spaced repetition core data, stored as fixed-point tenths in
+    # TINYINT UNSIGNED; the hybrid properties below expose them as floats
+    mastery_level_x10 = Column("mastery_level", FIXED_POINT, default=0)  # 0 to 50
     repetitions = Column(Integer, default=0)
-    ease_factor = Column(DECIMAL(3, 1), default=2.5)
+    ease_factor_x10 = Column("ease_factor", FIXED_POINT, default=25)  # 13 to 50
     last_review = Column(Date, nullable=True)
     next_review = Column(Date, nullable=True)
     
@@ -80,17 +127,39 @@ class UserWord(Base):
     seen_count = Column(Integer, default=0)
     correct_count = Column(Integer, default=0)
     
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    updated_at = Column(DateTime, default=db_now, onupdate=db_now)
+    
+    @hybrid_property
+    def mastery_level(self) -> float:
+        return self.mastery_level_x10 / 10
+    
+    @mastery_level.setter
+    def mastery_level(self, value: float) -> None:
+        self.mastery_level_x10 = round(value * 10)
+    
+    @hybrid_property
+    def ease_factor(self) -> float:
+        return self.ease_factor_x10 / 10
     
-    # Relationships
-    user = relationship("User", back_populates="user_words")
+    @ease_factor.setter
+    def ease_factor(self, value: float) -> None:
+        self.ease_factor_x10 = round(value * 10)
     
-    # Indexes for review queries
+    # Relationships. Many-to-one by primary key: "select" resolves from the
+    # identity map without SQL when the user is already loaded, where "joined"
+    # would repeat the user row on every word.
+    user = relationship("User", back_populates="user_words", lazy="select")
+    
+    # Indexes for review queries. idx_user_words_review_cov covers the
+    # review-due query: its key order matches the ORDER BY, and word_id comes
+    # free as part of the InnoDB primary key (MySQL has no INCLUDE columns).
+    # It also serves lookups by (user_id, mastery_level). Nothing filters on
+    # next_review or last_review alone, so they get no index of their own.
     __table_args__ = (
-        Index("idx_review_due", "user_id", "next_review"),
-        Index("idx_mastery", "user_id", "mastery_level"),
-        Index("idx_last_review", "user_id", "last_review"),
-        Index("idx_user_words_review_compound", "user_id", "next_review", "mastery_level"),
+        Index(
+            "idx_user_words_review_cov",
+            "user_id", "mastery_level", "last_review", "next_review", "repetitions", "seen_count",
+        ),
     )
 
 
@@ -99,27 +168,26 @@ class Session(Base):
     __tablename__ = "sessions"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(String(50), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(USER_ID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     practice_type = Column(SQLEnum("flashcard", "typing", "choice", name="practice_type"), nullable=False)
     
     # Results summary
     words_count = Column(Integer, default=0)
     correct_count = Column(Integer, default=0)
-    accuracy = Column(DECIMAL(4, 1), default=0.0)
+    accuracy = Column(DECIMAL(4, 1, asdecimal=False), default=0.0)  # Percent; read back as float
     duration_seconds = Column(Integer, default=0)
     
-    started_at = Column(DateTime, server_default=func.now())
+    started_at = Column(DateTime, default=db_now)
     completed_at = Column(DateTime, nullable=True)
     
-    # Relationships
-    user = relationship("User", back_populates="sessions")
-    session_answers = relationship("SessionAnswer", back_populates="session", cascade="all, delete-orphan")
+    # Relationships (see User/UserWord for the loading strategy)
+    user = relationship("User", back_populates="sessions", lazy="select")
+    session_answers = relationship("SessionAnswer", back_populates="session", cascade="all, delete-orphan", lazy="select")
     
     # Indexes for performance
     __table_args__ = (
         Index("idx_user_date", "user_id", "started_at"),
         Index("idx_completed", "completed_at"),
-        Index("idx_user_completed", "user_id", "completed_at"),
         Index("idx_sessions_user_completed_compound", "user_id", "completed_at", "started_at"),
     )
 
@@ -130,17 +198,16 @@ class SessionAnswer(Base):
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     session_id = Column(Integer, ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False)
-    word_id = Column(String(100), nullable=False)  # References JSON vocabulary
+    word_id = Column(WORD_ID, nullable=False)  # References JSON vocabulary
     is_correct = Column(Boolean, nullable=False)
     response_time_ms = Column(Integer, default=0)
     quality_score = Column(Integer, default=0)  # 0-5 for spaced repetition
     
-    # Relationships
-    session = relationship("Session", back_populates="session_answers")
+    # Relationships (see User/UserWord for the loading strategy)
+    session = relationship("Session", back_populates="session_answers", lazy="select")
     
     # Indexes for analytics
     __table_args__ = (
-        Index("idx_session", "session_id"),
         Index("idx_word_performance", "word_id", "is_correct"),
         Index("idx_session_word", "session_id", "word_id"),
         Index("idx_session_answers_performance", "session_id", "is_correct", "response_time_ms"),
@@ -152,7 +219,7 @@ class Payment(Base):
     __tablename__ = "payments"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(String(50), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(USER_ID, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     amount = Column(DECIMAL(8, 2), nullable=False)
     currency = Column(String(10), default="CNY")
     method = Column(SQLEnum("alipay", "wechat", name="payment_method"), nullable=False)
@@ -162,17 +229,16 @@ class Payment(Base):
     out_trade_no = Column(String(200), unique=True, nullable=False)
     gateway_txn_id = Column(String(200), nullable=True)
     
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(DateTime, default=db_now)
     completed_at = Column(DateTime, nullable=True)
     
-    # Relationships
-    user = relationship("User", back_populates="payments")
+    # Relationships (see User/UserWord for the loading strategy)
+    user = relationship("User", back_populates="payments", lazy="select")
     
     # Indexes for payment lookups
     __table_args__ = (
         Index("idx_user", "user_id"),
         Index("idx_status", "status"),
-        Index("idx_trade_no", "out_trade_no"),
         Index("idx_payments_created", "created_at"),
     )
 
@@ -182,25 +248,89 @@ class Event(Base):
     __tablename__ = "events"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
-    user_id = Column(String(50), ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    # No foreign key: MySQL does not allow them on partitioned tables
+    user_id = Column(USER_ID, nullable=True)
     anonymous_session_id = Column(String(100), nullable=True)  # Track anonymous users
     event_type = Column(
         SQLEnum("anonymous_trial", "registration", "login", "payment", "session", "sync", "error", 
                 name="event_type"), 
         nullable=False
     )
-    event_data = Column(JSON, nullable=True)
+    event_payload = Column("event_data", LargeBinary, nullable=True)  # See pack_event_data
     ip_address = Column(String(45), nullable=True)
-    user_agent = Column(Text, nullable=True)
-    created_at = Column(DateTime, server_default=func.now())
+    user_agent_id = Column(Integer, nullable=True)  # Interned in user_agents
+    created_at = Column(DateTime, default=db_now)
+    
+    @hybrid_property
+    def event_data(self) -> Any:
+        return unpack_event_data(self.event_payload)
+    
+    @event_data.setter
+    def event_data(self, value: Any) -> None:
+        self.event_payload = pack_event_data(value)
     
-    # Relationships
-    user = relationship("User", back_populates="events")
+    @event_data.expression
+    def event_data(cls):
+        return cls.event_payload
     
-    # Indexes for event queries
+    # Relationships (see User/UserWord for the loading strategy)
+    user = relationship(
+        "User", back_populates="events", lazy="select",
+        primaryjoin="foreign(Event.user_id) == User.id",
+    )
+    user_agent = relationship(
+        "UserAgent", lazy="select",
+        primaryjoin="foreign(Event.user_agent_id) == UserAgent.id",
+    )
+    
+    # Indexes for event queries. On MySQL the table is also range-partitioned
+    # by month of created_at (see partition_events below).
     __table_args__ = (
         Index("idx_user_type", "user_id", "event_type"),
         Index("idx_anonymous_session", "anonymous_session_id", "event_type"),
         Index("idx_events_created", "created_at"),
         Index("idx_event_type", "event_type"),
     )
+
+
+class UserAgent(Base):
+    """Distinct User-Agent strings, referenced from events by id."""
+    __tablename__ = "user_agents"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    ua_hash = Column(
+        LargeBinary(32).with_variant(mysql.BINARY(32), "mysql"), unique=True, nullable=False
+    )  # SHA-256 of ua
+    ua = Column(Text, nullable=False)
+
+
+# Months of events partitions created ahead of time; RotateEventPartitions
+# in schema.sql keeps extending this monthly
+EVENT_PARTITIONS_AHEAD = 3
+
+
+def event_partitions_ddl(today: date, months_ahead: int = EVENT_PARTITIONS_AHEAD) -> str:
+    """
+    ALTER TABLE statement partitioning events by month of created_at.
+    MySQL requires the partition column in the primary key, hence (id, created_at).
+    """
+    month = today.replace(day=1)
+    partitions = []
+    for _ in range(months_ahead):
+        next_month = (month + timedelta(days=32)).replace(day=1)
+        partitions.append(
+            f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{next_month.isoformat()}'))"
+        )
+        month = next_month
+    partitions.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+    return (
+        "ALTER TABLE events DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at) "
+        "PARTITION BY RANGE (TO_DAYS(created_at)) (" + ", ".join(partitions) + ")"
+    )
+
+
+@event.listens_for(Event.__table__, "after_create")
+def partition_events(target, connection, **kw) -> None:
+    """Partition the events table when it is created on MySQL."""
+    if connection.dialect.name == "mysql":
+        connection.exec_driver_sql(event_partitions_ddl(date.today()))
@@ -4,10 +4,15 @@ Ensures type safety and automatic API documentation.
 """
 from datetime import date, datetime
 from decimal import Decimal
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from enum import Enum
 
-from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from pydantic import (
+    BaseModel, ConfigDict, EmailStr, Field, TypeAdapter, ValidationError,
+    field_validator, model_validator
+)
+
+from app.core.clock import parse_client_date, parse_client_datetime, utc_now
 
 
 # Enums
@@ -34,19 +39,31 @@ class PaymentStatus(str, Enum):
     failed = "failed"
 
 
+# Response models are built once per request and never modified afterwards;
+# use model_copy(update=...) for a changed copy
+RESPONSE_CONFIG = ConfigDict(frozen=True, extra="ignore")
+ORM_RESPONSE_CONFIG = ConfigDict(
+    from_attributes=True, frozen=True, extra="ignore", populate_by_name=True
+)
+
+
 # Base schemas
 class BaseResponse(BaseModel):
     """Standard API response format."""
     success: bool = True
     message: Optional[str] = None
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: datetime = Field(default_factory=utc_now)
+    
+    model_config = RESPONSE_CONFIG
 
 
 class ErrorResponse(BaseModel):
     """Standard error response format."""
     success: bool = False
     error: Dict[str, Any]
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: datetime = Field(default_factory=utc_now)
+    
+    model_config = RESPONSE_CONFIG
 
 
 # User schemas
@@ -86,7 +103,7 @@ class UserLogin(BaseModel):
 
 class UserResponse(UserBase):
     """User response schema."""
-    id: str
+    id: str = Field(validation_alias="external_id")  # Public ID, not the internal key
     registered_from_trial: bool
     total_words_learned: int
     current_streak: int
@@ -98,19 +115,31 @@ class UserResponse(UserBase):
     created_at: datetime
     last_login_at: Optional[datetime]
     
-    class Config:
-        from_attributes = True
+    model_config = ORM_RESPONSE_CONFIG
+
+
+class AuthData(BaseModel):
+    """Authentication payload: user profile and access token."""
+    user: UserResponse
+    token: str
+    expires_in: int  # Minutes
+    
+    model_config = RESPONSE_CONFIG
 
 
 class AuthResponse(BaseResponse):
     """Authentication response schema."""
-    data: Dict[str, Any]  # Contains user and token
+    data: AuthData
+
+
+# Vocabulary keys are stored as ASCII (printable characters only)
+WORD_ID_PATTERN = r"^[ -~]+$"
 
 
 # Word progress schemas
 class WordProgressBase(BaseModel):
     """Base word progress schema."""
-    word_id: str
+    word_id: str = Field(max_length=100, pattern=WORD_ID_PATTERN)
     mastery_level: float = Field(default=0.0, ge=0.0, le=5.0)
     repetitions: int = Field(default=0, ge=0)
     ease_factor: float = Field(default=2.5, ge=1.3, le=5.0)
@@ -125,6 +154,25 @@ class WordProgressCreate(WordProgressBase):
     pass
 
 
+# Built once; validating through it goes straight to the compiled core validator
+WordProgressListAdapter = TypeAdapter(List[WordProgressBase])
+
+
+def validate_words(raw: Union[str, bytes]) -> List[WordProgressBase]:
+    """Parse and validate a JSON array of word progress entries in one pass."""
+    return WordProgressListAdapter.validate_json(raw)
+
+
+class TrialWordProgress(WordProgressBase):
+    """Word progress entry from anonymous trial data."""
+    # Trial clients may send full timestamps for dates; an unparseable date
+    # is dropped rather than the word
+    _client_dates = field_validator("last_review", "next_review", mode="before")(parse_client_date)
+
+
+TrialWordListAdapter = TypeAdapter(List[TrialWordProgress])
+
+
 class WordProgressUpdate(BaseModel):
     """Word progress update schema."""
     is_correct: bool
@@ -134,17 +182,16 @@ class WordProgressUpdate(BaseModel):
 
 class WordProgressResponse(WordProgressBase):
     """Word progress response schema."""
-    user_id: str
+    user_id: int
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ORM_RESPONSE_CONFIG
 
 
 # Session schemas
 class SessionAnswerBase(BaseModel):
     """Base session answer schema."""
-    word_id: str
+    word_id: str = Field(max_length=100, pattern=WORD_ID_PATTERN)
     is_correct: bool
     response_time_ms: int = Field(default=0, ge=0)
     quality_score: int = Field(default=0, ge=0, le=5)
@@ -164,6 +211,34 @@ class SessionBase(BaseModel):
     duration_seconds: int = Field(default=0, ge=0)
 
 
+class TrialSessionSummary(SessionBase):
+    """Session summary from anonymous trial data."""
+    practice_type: PracticeType = PracticeType.flashcard
+    started_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+    _client_datetimes = field_validator("started_at", "completed_at", mode="before")(parse_client_datetime)
+
+
+TrialSessionListAdapter = TypeAdapter(List[TrialSessionSummary])
+
+
+def validate_trial_rows(adapter: TypeAdapter, rows: List[Any]) -> List[Any]:
+    """
+    Validate a list of trial rows in one pass, dropping the rows that fail.
+    Validation reports every bad row at once, so a payload with bad rows
+    costs one more pass over the rest.
+    """
+    try:
+        return adapter.validate_python(rows)
+    except ValidationError as e:
+        errors = e.errors()
+        if any(not error["loc"] for error in errors):
+            raise  # Not a list at all
+        bad = {error["loc"][0] for error in errors}
+        return adapter.validate_python([row for i, row in enumerate(rows) if i not in bad])
+
+
 class SessionStart(BaseModel):
     """Session start schema."""
     practice_type: PracticeType
@@ -180,12 +255,11 @@ class SessionComplete(BaseModel):
 class SessionResponse(SessionBase):
     """Session response schema."""
     id: int
-    user_id: str
+    user_id: int
     started_at: datetime
     completed_at: Optional[datetime]
     
-    class Config:
-        from_attributes = True
+    model_config = ORM_RESPONSE_CONFIG
 
 
 # Payment schemas
@@ -199,7 +273,7 @@ class PaymentCreate(BaseModel):
 class PaymentResponse(BaseModel):
     """Payment response schema."""
     id: int
-    user_id: str
+    user_id: int
     amount: Decimal
     currency: str
     method: PaymentMethod
@@ -209,8 +283,7 @@ class PaymentResponse(BaseModel):
     created_at: datetime
     completed_at: Optional[datetime]
     
-    class Config:
-        from_attributes = True
+    model_config = ORM_RESPONSE_CONFIG
 
 
 # Progress sync schemas
@@ -258,4 +331,6 @@ class HealthCheck(BaseModel):
     status: str = "healthy"
     version: str = "1.0.0"
     database_connected: bool
-    timestamp: datetime = Field(default_factory=datetime.now)
+    timestamp: datetime = Field(default_factory=utc_now)
+    
+    model_config = RESPONSE_CONFIG
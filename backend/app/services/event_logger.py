@@ -0,0 +1,109 @@
+"""
+Fire-and-forget event logging.
+Handlers queue events in memory; a background task writes them to the
+events table in batches, so no request waits on an event INSERT.
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.clock import db_timestamp, utc_now
+from app.core.config import settings
+from app.models.database import Event, pack_event_data
+
+
+logger = logging.getLogger("wordmate.events")
+
+
+class EventLogger:
+    """Buffers event rows until the next batch INSERT."""
+
+    def __init__(self, maxsize: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        # Batch the flusher is still collecting, so shutdown can write it
+        self._batch: List[Dict[str, Any]] = []
+
+    def log(
+        self,
+        event_type: str,
+        event_data: Optional[Dict[str, Any]] = None,
+        user_id: Optional[int] = None,
+        at: Optional[datetime] = None,
+        **columns: Any
+    ) -> None:
+        """
+        Queue an event for the next flush. Never blocks; when the queue is
+        full the event is dropped with a warning.
+        """
+        row = {
+            "user_id": user_id,
+            "event_type": event_type,
+            "event_data": event_data,
+            # Stamped now, not when the batch is written
+            "created_at": db_timestamp(at or utc_now()),
+            **columns,
+        }
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            logger.warning("Event queue full, dropping %s event", event_type)
+
+    async def flush(self, session_factory: async_sessionmaker) -> int:
+        """Write up to EVENT_FLUSH_BATCH queued events; returns rows written."""
+        rows: List[Dict[str, Any]] = []
+        while len(rows) < settings.EVENT_FLUSH_BATCH and not self.queue.empty():
+            rows.append(self.queue.get_nowait())
+        if rows:
+            await self._write(session_factory, rows)
+        return len(rows)
+
+    async def run_flusher(self, session_factory: async_sessionmaker) -> None:
+        """
+        Background loop: once an event arrives, wait up to EVENT_FLUSH_SECONDS
+        for the batch to fill, then write it.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self.queue.get())
+            deadline = loop.time() + settings.EVENT_FLUSH_SECONDS
+            while len(self._batch) < settings.EVENT_FLUSH_BATCH:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            rows, self._batch = self._batch, []
+            try:
+                await self._write(session_factory, rows)
+            except Exception:
+                logger.exception("Failed to write %d events", len(rows))
+
+    async def drain(self, session_factory: async_sessionmaker) -> None:
+        """Write everything still queued; called on shutdown."""
+        try:
+            if self._batch:
+                rows, self._batch = self._batch, []
+                await self._write(session_factory, rows)
+            while await self.flush(session_factory):
+                pass
+        except Exception:
+            logger.exception("Failed to write queued events on shutdown")
+
+    async def _write(self, session_factory: async_sessionmaker, rows: List[Dict[str, Any]]) -> None:
+        """One executemany INSERT and one commit for a batch of rows."""
+        # Payloads are compressed here rather than on the request path
+        for row in rows:
+            row["event_payload"] = pack_event_data(row.pop("event_data"))
+        async with session_factory() as db:
+            await db.execute(insert(Event), rows)
+            await db.commit()
+
+
+# Shared instance
+event_logger = EventLogger(maxsize=settings.EVENT_QUEUE_SIZE)
@@ -2,24 +2,141 @@
 Progress service for handling user progress data.
 Manages word progress, sessions, and trial data import.
 """
+import logging
 from datetime import date, datetime
 from typing import Dict, Any, List, Optional
-from decimal import Decimal
 
-from sqlalchemy.orm import Session
+import numpy as np
+from sqlalchemy import bindparam, insert, select, tuple_, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.core.auth import invalidate_user_snapshot
+from app.core.clock import db_now, parse_client_date, parse_client_datetime
 from app.models.database import User, UserWord, Session as DBSession, SessionAnswer
-from app.schemas import WordProgressBase, ProgressSyncData
+from app.schemas import (
+    WordProgressBase, ProgressSyncData, SessionComplete, SessionAnswerCreate,
+    TrialSessionListAdapter, TrialWordListAdapter, validate_trial_rows
+)
+from app.services.scheduler import schedule_reviews
+from app.services.user_stats_cache import UserStatsCache, user_stats_cache
+
+
+logger = logging.getLogger("wordmate.progress")
+
+# Hot-path queries built once with bound parameters, so every call reuses the
+# engine's compiled-statement cache instead of rebuilding the select.
+# Review-due words: only indexed columns, so the query is answered from
+# idx_user_words_review_cov alone
+REVIEW_DUE_QUERY = (
+    select(
+        UserWord.word_id,
+        UserWord.mastery_level_x10,
+        UserWord.last_review,
+        UserWord.seen_count,
+        UserWord.repetitions
+    ).where(
+        UserWord.user_id == bindparam("user_id"),
+        UserWord.mastery_level_x10 < 40
+    ).where(
+        (UserWord.next_review.is_(None)) |
+        (UserWord.next_review <= bindparam("today"))
+    ).order_by(
+        UserWord.mastery_level_x10.asc(),
+        UserWord.last_review.asc()
+    ).limit(bindparam("limit"))
+)
+# Progress summary: plain rows of just the columns sent to the client, so no
+# ORM objects are built or tracked for what is a read-only dump
+USER_SUMMARY_QUERY = select(
+    User.external_id,
+    User.username,
+    User.email,
+    User.grade,
+    User.total_words_learned,
+    User.current_streak,
+    User.max_streak,
+    User.last_active_date,
+    User.plan,
+    User.plan_status,
+    User.plan_expires_at
+).where(User.id == bindparam("user_id"))
+WORD_PROGRESS_QUERY = select(
+    UserWord.word_id,
+    UserWord.mastery_level_x10,
+    UserWord.repetitions,
+    UserWord.ease_factor_x10,
+    UserWord.last_review,
+    UserWord.next_review,
+    UserWord.seen_count,
+    UserWord.correct_count
+).where(UserWord.user_id == bindparam("user_id")).execution_options(yield_per=1000)
+RECENT_SESSIONS_QUERY = (
+    select(
+        DBSession.id,
+        DBSession.practice_type,
+        DBSession.words_count,
+        DBSession.correct_count,
+        DBSession.accuracy,
+        DBSession.duration_seconds,
+        DBSession.started_at,
+        DBSession.completed_at
+    ).where(
+        DBSession.user_id == bindparam("user_id"),
+        DBSession.started_at >= bindparam("since")
+    ).order_by(DBSession.started_at.desc()).limit(50)
+)
+# Scheduling state of the words answered in a session
+ANSWERED_WORDS_QUERY = select(
+    UserWord.word_id,
+    UserWord.repetitions,
+    UserWord.ease_factor_x10,
+    UserWord.mastery_level_x10,
+    UserWord.seen_count,
+    UserWord.correct_count
+).where(
+    UserWord.user_id == bindparam("user_id"),
+    UserWord.word_id.in_(bindparam("word_ids", expanding=True))
+)
+# Stored words a sync is about to overwrite whose (mastery, repetitions)
+# differ from the client's; matching rows never leave the database
+SYNC_CONFLICTS_QUERY = select(UserWord.word_id, UserWord.mastery_level_x10).where(
+    UserWord.user_id == bindparam("user_id"),
+    UserWord.word_id.in_(bindparam("word_ids", expanding=True)),
+    tuple_(UserWord.word_id, UserWord.mastery_level_x10, UserWord.repetitions).not_in(
+        bindparam("client_states", expanding=True)
+    )
+)
+
+# Client-wins upsert of whole user_words rows: INSERT ... ON DUPLICATE KEY
+# UPDATE on MySQL, ON CONFLICT on the SQLite test database
+_WORD_STATE = [column.name for column in UserWord.__table__.c if not column.primary_key]
+_mysql_upsert = mysql_insert(UserWord)
+_sqlite_upsert = sqlite_insert(UserWord)
+WORD_UPSERTS = {
+    "mysql": _mysql_upsert.on_duplicate_key_update(
+        {name: _mysql_upsert.inserted[name] for name in _WORD_STATE}
+    ),
+    "sqlite": _sqlite_upsert.on_conflict_do_update(
+        index_elements=["user_id", "word_id"],
+        set_={name: _sqlite_upsert.excluded[name] for name in _WORD_STATE},
+    ),
+}
 
 
 class ProgressService:
     """Service for managing user progress data."""
     
+    def __init__(self, stats_cache: Optional[UserStatsCache] = user_stats_cache):
+        # Write-behind buffer for user stats; None writes them directly
+        self.stats_cache = stats_cache
+    
     async def import_trial_progress(
         self, 
-        db: Session, 
-        user_id: str, 
+        db: AsyncSession, 
+        user_id: int, 
         trial_data: Dict[str, Any]
     ) -> None:
         """
@@ -51,117 +168,132 @@ class ProgressService:
         except Exception as e:
             raise Exception(f"Failed to import trial progress: {str(e)}")
     
+    async def import_trial_history(
+        self, 
+        session_factory: async_sessionmaker, 
+        user_id: int, 
+        trial_data: Dict[str, Any]
+    ) -> None:
+        """
+        Import trial word progress and sessions in a session of its own.
+        Runs as a background task after registration has responded; user
+        stats are applied at registration time via apply_trial_stats.
+        
+        Args:
+            session_factory: Factory for the task's own database session
+            user_id: User ID
+            trial_data: Trial data from anonymous user
+        """
+        words_data = trial_data.get("words", [])
+        sessions_data = trial_data.get("sessions", [])
+        if not words_data and not sessions_data:
+            return
+        
+        async with session_factory() as db:
+            try:
+                if words_data:
+                    await self._import_word_progress(db, user_id, words_data)
+                if sessions_data:
+                    await self._import_session_summaries(db, user_id, sessions_data)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                logger.exception("Failed to import trial history for %s", user_id)
+    
+    def apply_trial_stats(self, user: User, stats_data: Dict[str, Any]) -> None:
+        """Copy trial statistics onto a user object."""
+        user.total_words_learned = stats_data.get("total_words_learned", 0)
+        user.current_streak = stats_data.get("current_streak", 0)
+        user.max_streak = stats_data.get("max_streak", 0)
+        
+        # Parse last active date
+        last_active = stats_data.get("last_active_date")
+        if last_active:
+            user.last_active_date = self._parse_date(last_active)
+    
     async def _import_word_progress(
         self, 
-        db: Session, 
-        user_id: str, 
+        db: AsyncSession, 
+        user_id: int, 
         words_data: List[Dict[str, Any]]
     ) -> None:
-        """Import word progress data."""
-        word_objects = []
+        """Import word progress data as one multi-row INSERT."""
+        # One validation pass over the whole list; invalid words are dropped
+        words = validate_trial_rows(TrialWordListAdapter, words_data)
+        if len(words) < len(words_data):
+            logger.warning("Skipping %d invalid trial words", len(words_data) - len(words))
         
-        for word_data in words_data:
-            try:
-                word_progress = UserWord(
-                    user_id=user_id,
-                    word_id=word_data.get("word_id", ""),
-                    mastery_level=Decimal(str(word_data.get("mastery_level", 0.0))),
-                    repetitions=word_data.get("repetitions", 0),
-                    ease_factor=Decimal(str(word_data.get("ease_factor", 2.5))),
-                    last_review=self._parse_date(word_data.get("last_review")),
-                    next_review=self._parse_date(word_data.get("next_review")),
-                    seen_count=word_data.get("seen_count", 0),
-                    correct_count=word_data.get("correct_count", 0),
-                )
-                word_objects.append(word_progress)
-                
-            except Exception as e:
-                # Log error but continue with other words
-                print(f"Error importing word {word_data.get('word_id')}: {str(e)}")
-                continue
+        now = db_now()
+        rows = [
+            {
+                "user_id": user_id,
+                "word_id": word.word_id,
+                "mastery_level_x10": round(word.mastery_level * 10),
+                "repetitions": word.repetitions,
+                "ease_factor_x10": round(word.ease_factor * 10),
+                "last_review": word.last_review,
+                "next_review": word.next_review,
+                "seen_count": word.seen_count,
+                "correct_count": word.correct_count,
+                "updated_at": now,
+            }
+            for word in words
+        ]
         
-        # Bulk insert word progress
-        if word_objects:
-            db.add_all(word_objects)
+        # Plain dicts through an executemany; no ORM objects per word
+        if rows:
+            await db.execute(insert(UserWord), rows)
     
     async def _import_session_summaries(
         self, 
-        db: Session, 
-        user_id: str, 
+        db: AsyncSession, 
+        user_id: int, 
         sessions_data: List[Dict[str, Any]]
     ) -> None:
-        """Import session summary data (last few sessions only)."""
+        """Import session summary data (last few sessions only), in one INSERT."""
         # Only import last 5 sessions to avoid data overload
-        recent_sessions = sessions_data[-5:] if len(sessions_data) > 5 else sessions_data
+        recent_sessions = sessions_data[-5:]
+        sessions = validate_trial_rows(TrialSessionListAdapter, recent_sessions)
+        if len(sessions) < len(recent_sessions):
+            logger.warning("Skipping %d invalid trial sessions", len(recent_sessions) - len(sessions))
         
-        session_objects = []
-        for session_data in recent_sessions:
-            try:
-                session = DBSession(
-                    user_id=user_id,
-                    practice_type=session_data.get("practice_type", "flashcard"),
-                    words_count=session_data.get("words_count", 0),
-                    correct_count=session_data.get("correct_count", 0),
-                    accuracy=Decimal(str(session_data.get("accuracy", 0.0))),
-                    duration_seconds=session_data.get("duration_seconds", 0),
-                    started_at=self._parse_datetime(session_data.get("started_at")),
-                    completed_at=self._parse_datetime(session_data.get("completed_at")),
-                )
-                session_objects.append(session)
-                
-            except Exception as e:
-                print(f"Error importing session: {str(e)}")
-                continue
+        now = db_now()
+        rows = [
+            {
+                "user_id": user_id,
+                "practice_type": session.practice_type.value,
+                "words_count": session.words_count,
+                "correct_count": session.correct_count,
+                "accuracy": round(session.accuracy, 1),
+                "duration_seconds": session.duration_seconds,
+                "started_at": session.started_at or now,
+                "completed_at": session.completed_at,
+            }
+            for session in sessions
+        ]
         
-        if session_objects:
-            db.add_all(session_objects)
+        if rows:
+            await db.execute(insert(DBSession), rows)
     
     async def _update_user_stats(
         self, 
-        db: Session, 
-        user_id: str, 
+        db: AsyncSession, 
+        user_id: int, 
         stats_data: Dict[str, Any]
     ) -> None:
         """Update user statistics from trial data."""
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if user:
-            user.total_words_learned = stats_data.get("total_words_learned", 0)
-            user.current_streak = stats_data.get("current_streak", 0)
-            user.max_streak = stats_data.get("max_streak", 0)
-            
-            # Parse last active date
-            last_active = stats_data.get("last_active_date")
-            if last_active:
-                user.last_active_date = self._parse_date(last_active)
-    
-    def _parse_date(self, date_str: Optional[str]) -> Optional[date]:
-        """Parse date string to date object."""
-        if not date_str:
-            return None
-        
-        try:
-            if isinstance(date_str, str):
-                return datetime.fromisoformat(date_str.replace('Z', '+00:00')).date()
-            return date_str
-        except (ValueError, AttributeError):
-            return None
+            self.apply_trial_stats(user, stats_data)
     
-    def _parse_datetime(self, datetime_str: Optional[str]) -> Optional[datetime]:
-        """Parse datetime string to datetime object."""
-        if not datetime_str:
-            return None
-        
-        try:
-            if isinstance(datetime_str, str):
-                return datetime.fromisoformat(datetime_str.replace('Z', '+00:00'))
-            return datetime_str
-        except (ValueError, AttributeError):
-            return None
+    # Shared with the trial payload schemas
+    _parse_date = staticmethod(parse_client_date)
+    _parse_datetime = staticmethod(parse_client_datetime)
     
     async def get_words_for_review(
         self, 
-        db: Session, 
-        user_id: str, 
+        db: AsyncSession, 
+        user_id: int, 
         limit: int = 20
     ) -> List[Dict[str, Any]]:
         """
@@ -177,26 +309,22 @@ class ProgressService:
         """
         try:
             # Get words due for review
-            words = db.query(UserWord).filter(
-                UserWord.user_id == user_id,
-                UserWord.mastery_level < 4.0
-            ).filter(
-                (UserWord.next_review.is_(None)) | 
-                (UserWord.next_review <= date.today())
-            ).order_by(
-                UserWord.mastery_level.asc(),
-                UserWord.last_review.asc()
-            ).limit(limit).all()
+            result = await db.execute(
+                REVIEW_DUE_QUERY,
+                {"user_id": user_id, "today": date.today(), "limit": limit},
+            )
             
+            # Straight from the cursor rows; last_review stays a date for
+            # the orjson response class to serialize
             return [
                 {
                     "word_id": word.word_id,
-                    "mastery_level": float(word.mastery_level),
-                    "last_review": word.last_review.isoformat() if word.last_review else None,
+                    "mastery_level": word.mastery_level_x10 / 10,
+                    "last_review": word.last_review,
                     "seen_count": word.seen_count,
                     "repetitions": word.repetitions
                 }
-                for word in words
+                for word in result
             ]
             
         except Exception as e:
@@ -204,8 +332,8 @@ class ProgressService:
     
     async def sync_user_progress(
         self, 
-        db: Session, 
-        user_id: str, 
+        db: AsyncSession, 
+        user_id: int, 
         sync_data: ProgressSyncData
     ) -> Dict[str, Any]:
         """
@@ -219,85 +347,219 @@ class ProgressService:
         Returns:
             Sync result with conflicts and updated data
         """
+        # One timestamp (and UTC date) for every row this sync writes
+        now = db_now()
+        today = now.date()
         try:
+            # Last entry wins when the client sends a word twice
+            words = {word_data.word_id: word_data for word_data in sync_data.words}
+            
+            rows = [
+                {
+                    "user_id": user_id,
+                    "word_id": word_id,
+                    "mastery_level_x10": round(word_data.mastery_level * 10),
+                    "repetitions": word_data.repetitions,
+                    "ease_factor_x10": round(word_data.ease_factor * 10),
+                    "last_review": word_data.last_review,
+                    "next_review": word_data.next_review,
+                    "seen_count": word_data.seen_count,
+                    "correct_count": word_data.correct_count,
+                    "updated_at": now,
+                }
+                for word_id, word_data in words.items()
+            ]
+            
+            # Client wins; stored words that differ are reported back as
+            # conflicts. Only those rows are fetched.
             conflicts = []
-            updated_words = 0
+            if rows:
+                result = await db.execute(SYNC_CONFLICTS_QUERY, {
+                    "user_id": user_id,
+                    "word_ids": list(words),
+                    "client_states": [
+                        (row["word_id"], row["mastery_level_x10"], row["repetitions"]) for row in rows
+                    ],
+                })
+                conflicts = [
+                    {
+                        "word_id": server.word_id,
+                        "server_mastery": server.mastery_level_x10 / 10,
+                        "client_mastery": words[server.word_id].mastery_level,
+                        "resolution": "client_wins"
+                    }
+                    for server in result
+                ]
             
-            # Process word progress updates
-            for word_data in sync_data.words:
-                try:
-                    existing_word = db.query(UserWord).filter(
-                        UserWord.user_id == user_id,
-                        UserWord.word_id == word_data.word_id
-                    ).first()
-                    
-                    if existing_word:
-                        # Check for conflicts
-                        if (existing_word.mastery_level != word_data.mastery_level or
-                            existing_word.repetitions != word_data.repetitions):
-                            conflicts.append({
-                                "word_id": word_data.word_id,
-                                "server_mastery": float(existing_word.mastery_level),
-                                "client_mastery": word_data.mastery_level,
-                                "resolution": "client_wins"
-                            })
-                        
-                        # Update with client data (client wins strategy)
-                        existing_word.mastery_level = Decimal(str(word_data.mastery_level))
-                        existing_word.repetitions = word_data.repetitions
-                        existing_word.ease_factor = Decimal(str(word_data.ease_factor))
-                        existing_word.last_review = word_data.last_review
-                        existing_word.next_review = word_data.next_review
-                        existing_word.seen_count = word_data.seen_count
-                        existing_word.correct_count = word_data.correct_count
-                        existing_word.updated_at = datetime.utcnow()
-                        
-                    else:
-                        # Create new word progress
-                        new_word = UserWord(
-                            user_id=user_id,
-                            word_id=word_data.word_id,
-                            mastery_level=Decimal(str(word_data.mastery_level)),
-                            repetitions=word_data.repetitions,
-                            ease_factor=Decimal(str(word_data.ease_factor)),
-                            last_review=word_data.last_review,
-                            next_review=word_data.next_review,
-                            seen_count=word_data.seen_count,
-                            correct_count=word_data.correct_count,
-                        )
-                        db.add(new_word)
-                    
-                    updated_words += 1
-                    
-                except Exception as e:
-                    print(f"Error syncing word {word_data.word_id}: {str(e)}")
-                    continue
+            # New and existing words in one upsert (a single multi-row
+            # statement through the driver's executemany)
+            if rows:
+                await db.execute(WORD_UPSERTS[db.get_bind().dialect.name], rows)
+            updated_words = len(words)
             
-            # Update user statistics
-            user = db.query(User).filter(User.id == user_id).first()
-            if user and sync_data.stats:
-                user.total_words_learned = sync_data.stats.get("total_words_learned", user.total_words_learned)
-                user.current_streak = sync_data.stats.get("current_streak", user.current_streak)
-                user.max_streak = max(user.max_streak, sync_data.stats.get("max_streak", 0))
-                user.last_active_date = date.today()
-                user.updated_at = datetime.utcnow()
+            # Update user statistics (buffered in Redis when configured)
+            if sync_data.stats and self.stats_cache is not None:
+                await self.stats_cache.record(user_id, sync_data.stats, today)
+            elif sync_data.stats:
+                user = await db.get(User, user_id)
+                if user:
+                    user.total_words_learned = sync_data.stats.get("total_words_learned", user.total_words_learned)
+                    user.current_streak = sync_data.stats.get("current_streak", user.current_streak)
+                    user.max_streak = max(user.max_streak, sync_data.stats.get("max_streak", 0))
+                    user.last_active_date = today
+                    user.updated_at = now
             
-            db.commit()
+            await db.commit()
+            invalidate_user_snapshot(user_id)
             
             return {
                 "updated_words": updated_words,
                 "conflicts": conflicts,
-                "sync_timestamp": datetime.utcnow().isoformat()
+                "sync_timestamp": now.isoformat()
             }
             
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             raise Exception(f"Failed to sync progress: {str(e)}")
-    
+
+    async def record_session(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        practice_type: str,
+        completion: SessionComplete
+    ) -> int:
+        """
+        Store a completed practice session and its answers.
+
+        Args:
+            db: Database session
+            user_id: User ID
+            practice_type: Practice mode of the session
+            completion: Session results submitted by the client
+
+        Returns:
+            ID of the new session
+        """
+        # One timestamp for the session and every row it writes
+        now = db_now()
+        words_count = completion.words_count
+        accuracy = round(completion.correct_count / words_count * 100, 1) if words_count else 0.0
+        try:
+            # One INSERT for the session; the new id comes back with the
+            # result (lastrowid on MySQL), no follow-up SELECT
+            result = await db.execute(
+                insert(DBSession).values(
+                    user_id=user_id,
+                    practice_type=practice_type,
+                    words_count=words_count,
+                    correct_count=completion.correct_count,
+                    accuracy=accuracy,
+                    duration_seconds=completion.duration_seconds,
+                    started_at=now,
+                    completed_at=now,
+                )
+            )
+            session_id = result.inserted_primary_key[0]
+
+            # All answers in one executemany, which the MySQL driver sends
+            # as a single multi-row INSERT
+            if completion.answers:
+                await db.execute(
+                    insert(SessionAnswer),
+                    [dict(session_id=session_id, **answer.model_dump()) for answer in completion.answers],
+                )
+                await self._schedule_answered_words(db, user_id, completion.answers, now)
+
+            await db.commit()
+            return session_id
+
+        except Exception as e:
+            await db.rollback()
+            raise Exception(f"Failed to record session: {str(e)}")
+
+    async def _schedule_answered_words(
+        self,
+        db: AsyncSession,
+        user_id: int,
+        answers: List[SessionAnswerCreate],
+        now: datetime
+    ) -> None:
+        """Run the SM-2 update for every answered word as one array batch."""
+        today = now.date()
+        # A word answered more than once gets its answers applied in order,
+        # one round per repeat
+        rounds: List[Dict[str, SessionAnswerCreate]] = []
+        for answer in answers:
+            for batch in rounds:
+                if answer.word_id not in batch:
+                    batch[answer.word_id] = answer
+                    break
+            else:
+                rounds.append({answer.word_id: answer})
+
+        word_ids = list(rounds[0])
+        position = {word_id: i for i, word_id in enumerate(word_ids)}
+        result = await db.execute(ANSWERED_WORDS_QUERY, {"user_id": user_id, "word_ids": word_ids})
+        stored = {row.word_id: row for row in result}
+
+        def column(read, default):
+            return np.array([read(stored[w]) if w in stored else default for w in word_ids])
+
+        repetitions = column(lambda row: row.repetitions or 0, 0)
+        ease_factor = column(lambda row: row.ease_factor_x10 / 10, 2.5)
+        mastery_level = column(lambda row: row.mastery_level_x10 / 10, 0.0)
+        seen_count = column(lambda row: row.seen_count or 0, 0)
+        correct_count = column(lambda row: row.correct_count or 0, 0)
+        interval_days = np.ones(len(word_ids), dtype=np.int64)
+
+        for batch in rounds:
+            idx = np.array([position[word_id] for word_id in batch])
+            # Answers without an explicit quality score count as 4 (correct)
+            # or 1 (wrong)
+            quality = np.array([
+                answer.quality_score or (4 if answer.is_correct else 1) for answer in batch.values()
+            ])
+            response_time_ms = np.array([answer.response_time_ms for answer in batch.values()])
+            schedule = schedule_reviews(
+                repetitions[idx], ease_factor[idx], mastery_level[idx], quality, response_time_ms
+            )
+            repetitions[idx] = schedule.repetitions
+            ease_factor[idx] = schedule.ease_factor
+            mastery_level[idx] = schedule.mastery_level
+            interval_days[idx] = schedule.interval_days
+            seen_count[idx] += 1
+            correct_count[idx] += np.array([answer.is_correct for answer in batch.values()])
+
+        # Day arithmetic on the whole array; tolist() yields datetime.date
+        next_reviews = (np.datetime64(today, "D") + interval_days).tolist()
+        rows = [
+            {
+                "user_id": user_id,
+                "word_id": word_id,
+                "repetitions": int(repetitions[i]),
+                "ease_factor_x10": int(round(ease_factor[i] * 10)),
+                "mastery_level_x10": int(round(mastery_level[i] * 10)),
+                "last_review": today,
+                "next_review": next_reviews[i],
+                "seen_count": int(seen_count[i]),
+                "correct_count": int(correct_count[i]),
+                "updated_at": now,
+            }
+            for i, word_id in enumerate(word_ids)
+        ]
+        # ORM bulk UPDATE by primary key and bulk INSERT, one executemany each
+        existing = [row for row in rows if row["word_id"] in stored]
+        new = [row for row in rows if row["word_id"] not in stored]
+        if existing:
+            await db.execute(update(UserWord), existing)
+        if new:
+            await db.execute(insert(UserWord), new)
+
     async def get_user_progress_summary(
         self, 
-        db: Session, 
-        user_id: str
+        db: AsyncSession, 
+        user_id: int
     ) -> Dict[str, Any]:
         """
         Get complete user progress summary for client sync.
@@ -307,35 +569,41 @@ class ProgressService:
             user_id: User ID
             
         Returns:
-            Complete progress data for client
+            Complete progress data for client. Dates and datetimes are
+            left as objects; the orjson response class serializes them
         """
+        now = datetime.utcnow()
         try:
             # Get user info
-            user = db.query(User).filter(User.id == user_id).first()
+            result = await db.execute(USER_SUMMARY_QUERY, {"user_id": user_id})
+            user = result.first()
             if not user:
                 raise Exception("User not found")
             
-            # Get word progress
-            words = db.query(UserWord).filter(UserWord.user_id == user_id).all()
+            # Get word progress, streamed 1000 rows at a time so only the
+            # output dicts are held in full, never all the raw rows too
+            words = await db.stream(WORD_PROGRESS_QUERY, {"user_id": user_id})
             word_progress = [
                 {
                     "word_id": word.word_id,
-                    "mastery_level": float(word.mastery_level),
+                    "mastery_level": word.mastery_level_x10 / 10,
                     "repetitions": word.repetitions,
-                    "ease_factor": float(word.ease_factor),
-                    "last_review": word.last_review.isoformat() if word.last_review else None,
-                    "next_review": word.next_review.isoformat() if word.next_review else None,
+                    "ease_factor": word.ease_factor_x10 / 10,
+                    "last_review": word.last_review,
+                    "next_review": word.next_review,
                     "seen_count": word.seen_count,
                     "correct_count": word.correct_count,
                 }
-                for word in words
+                async for word in words
             ]
             
-            # Get recent sessions (last 30 days)
-            recent_sessions = db.query(DBSession).filter(
-                DBSession.user_id == user_id,
-                DBSession.started_at >= datetime.utcnow().replace(day=1)  # This month
-            ).order_by(DBSession.started_at.desc()).limit(50).all()
+            # Get this month's sessions, newest first; idx_user_date read
+            # backwards gives the order, so no sort
+            month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            result = await db.execute(
+                RECENT_SESSIONS_QUERY, {"user_id": user_id, "since": month_start}
+            )
+            recent_sessions = result.all()
             
             sessions_summary = [
                 {
@@ -343,32 +611,36 @@ class ProgressService:
                     "practice_type": session.practice_type,
                     "words_count": session.words_count,
                     "correct_count": session.correct_count,
-                    "accuracy": float(session.accuracy),
+                    "accuracy": session.accuracy,
                     "duration_seconds": session.duration_seconds,
-                    "started_at": session.started_at.isoformat(),
-                    "completed_at": session.completed_at.isoformat() if session.completed_at else None,
+                    "started_at": session.started_at,
+                    "completed_at": session.completed_at,
                 }
                 for session in recent_sessions
             ]
             
             return {
                 "user": {
-                    "id": user.id,
+                    "id": user.external_id,
                     "username": user.username,
                     "email": user.email,
                     "grade": user.grade,
                     "total_words_learned": user.total_words_learned,
                     "current_streak": user.current_streak,
                     "max_streak": user.max_streak,
-                    "last_active_date": user.last_active_date.isoformat() if user.last_active_date else None,
+                    "last_active_date": user.last_active_date,
                     "plan": user.plan,
                     "plan_status": user.plan_status,
-                    "plan_expires_at": user.plan_expires_at.isoformat() if user.plan_expires_at else None,
+                    "plan_expires_at": user.plan_expires_at,
                 },
                 "words": word_progress,
                 "sessions": sessions_summary,
-                "sync_timestamp": datetime.utcnow().isoformat()
+                "sync_timestamp": now
             }
             
         except Exception as e:
             raise Exception(f"Failed to get progress summary: {str(e)}")
+
+
+# Shared instance; the service holds no per-request state
+progress_service = ProgressService()
@@ -0,0 +1,106 @@
+"""
+Nightly recomputation of review due dates.
+Walks user_words one tile of users at a time and rewrites next_review
+wherever it disagrees with the stored SM-2 state.
+
+Run from cron: python -m app.services.review_rescheduler
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import Row, bindparam, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.database import User, UserWord
+from app.services.scheduler import review_interval_days
+
+
+logger = logging.getLogger("wordmate.rescheduler")
+
+# Users per tile. A tile's rows are contiguous in the (user_id, word_id)
+# clustered index, so each tile is a range read instead of random page hits
+USER_TILE_SIZE = 1000
+# Rows fetched per round trip while streaming a tile
+ROWS_PER_FETCH = 5000
+
+USER_TILE_QUERY = (
+    select(User.id)
+    .where(User.id > bindparam("after"))
+    .order_by(User.id)
+    .limit(bindparam("limit"))
+)
+TILE_WORDS_QUERY = (
+    select(
+        UserWord.user_id,
+        UserWord.word_id,
+        UserWord.repetitions,
+        UserWord.ease_factor_x10,
+        UserWord.last_review,
+        UserWord.next_review
+    ).where(
+        UserWord.user_id.in_(bindparam("user_ids", expanding=True)),
+        UserWord.last_review.is_not(None)
+    ).order_by(UserWord.user_id, UserWord.word_id)
+    .execution_options(yield_per=ROWS_PER_FETCH)
+)
+
+
+async def reschedule_reviews(session_factory: async_sessionmaker, tile_size: int = USER_TILE_SIZE) -> int:
+    """
+    Recompute next_review for every reviewed word, one transaction per tile.
+
+    Args:
+        session_factory: Session factory for the job's own sessions
+        tile_size: Users per tile
+
+    Returns:
+        Number of rows whose next_review changed
+    """
+    changed = 0
+    after = 0
+    while True:
+        async with session_factory() as db:
+            result = await db.execute(USER_TILE_QUERY, {"after": after, "limit": tile_size})
+            user_ids = result.scalars().all()
+            if not user_ids:
+                return changed
+
+            updates: List[Dict[str, Any]] = []
+            result = await db.stream(TILE_WORDS_QUERY, {"user_ids": user_ids})
+            async for rows in result.partitions():
+                updates += _due_date_updates(rows)
+
+            # ORM bulk UPDATE by primary key, one executemany per tile
+            if updates:
+                await db.execute(update(UserWord), updates)
+                await db.commit()
+
+        changed += len(updates)
+        after = user_ids[-1]
+
+
+def _due_date_updates(rows: Sequence[Row]) -> List[Dict[str, Any]]:
+    """Primary keys and new due dates of the rows whose next_review is off."""
+    repetitions = np.array([row.repetitions or 0 for row in rows])
+    ease_factor = np.array([row.ease_factor_x10 for row in rows]) / 10
+    last_review = np.array([row.last_review for row in rows], dtype="datetime64[D]")
+    due = (last_review + review_interval_days(repetitions, ease_factor)).tolist()
+    return [
+        {"user_id": row.user_id, "word_id": row.word_id, "next_review": next_review}
+        for row, next_review in zip(rows, due)
+        if row.next_review != next_review
+    ]
+
+
+async def main() -> None:
+    from app.db.database import SessionLocal
+
+    changed = await reschedule_reviews(SessionLocal)
+    logger.info("Rescheduled %d words", changed)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
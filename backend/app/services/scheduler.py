@@ -0,0 +1,154 @@
+"""
+Spaced repetition scheduling (SM-2 variant) over batches of words.
+Mirrors SpacedRepetitionService in the frontend so server-side updates
+agree with what the client computes offline.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # numba is optional
+    numba = None
+
+
+MIN_EASE = 1.3
+MAX_EASE = 5.0  # Storage limit of user_words.ease_factor
+MAX_MASTERY = 5.0
+
+# Below this many words the NumPy expressions beat the compiled loop's
+# thread dispatch; only large batches (bulk rescheduling) go compiled
+COMPILED_MIN_BATCH = 4096
+
+prange = numba.prange if numba is not None else range
+
+
+class Schedule(NamedTuple):
+    """New scheduling state for a batch of words, one array entry per word."""
+    repetitions: np.ndarray
+    ease_factor: np.ndarray
+    mastery_level: np.ndarray
+    interval_days: np.ndarray
+
+
+def schedule_reviews(
+    repetitions: np.ndarray,
+    ease_factor: np.ndarray,
+    mastery_level: np.ndarray,
+    quality: np.ndarray,
+    response_time_ms: np.ndarray,
+) -> Schedule:
+    """
+    Apply one answer to each word.
+
+    Args:
+        repetitions: Current repetition counts
+        ease_factor: Current ease factors
+        mastery_level: Current mastery levels (0-5)
+        quality: Answer quality (0-5)
+        response_time_ms: Response times; 0 when unknown
+
+    Returns:
+        Updated state and the days until each word's next review
+    """
+    if _compiled_loop is not None and len(quality) >= COMPILED_MIN_BATCH:
+        return _schedule_compiled(repetitions, ease_factor, mastery_level, quality, response_time_ms)
+
+    quality = np.clip(quality, 0, 5).astype(np.float64)
+    passed = quality >= 3
+
+    new_repetitions = np.where(passed, repetitions + 1, 0)
+
+    lapse = 5 - quality
+    new_ease = ease_factor + (0.1 - lapse * (0.08 + lapse * 0.02))
+    new_ease = np.clip(new_ease, MIN_EASE, MAX_EASE)
+
+    # Mastery moves by answer quality, response speed and a streak bonus
+    mastery = mastery_level + np.select(
+        [quality >= 4, quality == 3, quality == 2], [0.7, 0.4, -0.4], default=-0.9
+    )
+    seconds = response_time_ms / 1000
+    mastery += np.where(
+        seconds > 0, np.where(seconds < 3, 0.1, np.where(seconds < 5, 0.05, -0.05)), 0
+    )
+    mastery += np.where((repetitions >= 3) & (quality >= 4), 0.1, 0)
+    mastery = np.clip(mastery, 0, MAX_MASTERY)
+
+    return Schedule(
+        repetitions=new_repetitions.astype(np.int64),
+        ease_factor=new_ease,
+        mastery_level=mastery,
+        interval_days=review_interval_days(new_repetitions, new_ease),
+    )
+
+
+def review_interval_days(repetitions: np.ndarray, ease_factor: np.ndarray) -> np.ndarray:
+    """
+    Days between reviews for words in a given (post-answer) state:
+    1 day after a lapse, 6 days for the first two passes, then 6 * ease^(n-2).
+    """
+    growth = 6 * np.power(ease_factor, np.maximum(repetitions - 2, 0))
+    interval = np.select([repetitions == 0, repetitions <= 2], [1, 6], default=np.ceil(growth))
+    return np.maximum(interval, 1).astype(np.int64)
+
+
+def _schedule_loop(repetitions, ease_factor, mastery_level, quality, response_time_ms,
+                   out_repetitions, out_ease, out_mastery, out_interval):
+    """Per-word form of schedule_reviews, compiled by numba when installed."""
+    for i in prange(quality.shape[0]):
+        q = min(max(quality[i], 0), 5)
+        reps = repetitions[i] + 1 if q >= 3 else 0
+
+        lapse = 5.0 - q
+        ease = ease_factor[i] + (0.1 - lapse * (0.08 + lapse * 0.02))
+        ease = min(max(ease, MIN_EASE), MAX_EASE)
+
+        if q >= 4:
+            mastery = mastery_level[i] + 0.7
+        elif q == 3:
+            mastery = mastery_level[i] + 0.4
+        elif q == 2:
+            mastery = mastery_level[i] - 0.4
+        else:
+            mastery = mastery_level[i] - 0.9
+        seconds = response_time_ms[i] / 1000
+        if seconds > 0:
+            mastery += 0.1 if seconds < 3 else (0.05 if seconds < 5 else -0.05)
+        if repetitions[i] >= 3 and q >= 4:
+            mastery += 0.1
+
+        if reps == 0:
+            interval = 1
+        elif reps <= 2:
+            interval = 6
+        else:
+            interval = max(int(np.ceil(6 * ease ** (reps - 2))), 1)
+
+        out_repetitions[i] = reps
+        out_ease[i] = ease
+        out_mastery[i] = min(max(mastery, 0.0), MAX_MASTERY)
+        out_interval[i] = interval
+
+
+_compiled_loop = numba.njit(parallel=True, cache=True)(_schedule_loop) if numba is not None else None
+
+
+def _schedule_compiled(repetitions, ease_factor, mastery_level, quality, response_time_ms) -> Schedule:
+    """Run a batch through the compiled loop on contiguous typed arrays."""
+    n = len(quality)
+    schedule = Schedule(
+        repetitions=np.empty(n, dtype=np.int64),
+        ease_factor=np.empty(n, dtype=np.float64),
+        mastery_level=np.empty(n, dtype=np.float64),
+        interval_days=np.empty(n, dtype=np.int64),
+    )
+    _compiled_loop(
+        np.ascontiguousarray(repetitions, dtype=np.int64),
+        np.ascontiguousarray(ease_factor, dtype=np.float64),
+        np.ascontiguousarray(mastery_level, dtype=np.float64),
+        np.ascontiguousarray(quality, dtype=np.int64),
+        np.ascontiguousarray(response_time_ms, dtype=np.int64),
+        *schedule,
+    )
+    return schedule
@@ -0,0 +1,52 @@
+"""
+Interned User-Agent strings.
+Events reference a row in user_agents instead of repeating the header text.
+"""
+import hashlib
+from typing import Optional
+
+from cachetools import LRUCache
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.database import UserAgent
+
+# Longer headers are truncated before hashing; real browsers stay far below
+MAX_USER_AGENT_LENGTH = 512
+
+# Only a few dozen distinct agents are expected, so known ids are kept per process
+user_agent_ids: LRUCache = LRUCache(maxsize=1024)
+
+USER_AGENT_LOOKUP = select(UserAgent.id).where(UserAgent.ua_hash == bindparam("ua_hash"))
+
+
+async def intern_user_agent(db: AsyncSession, user_agent: Optional[str]) -> Optional[int]:
+    """
+    Id of the user_agents row for a header value, inserting it on first sight.
+    Runs in the caller's transaction.
+    """
+    if not user_agent:
+        return None
+    user_agent = user_agent[:MAX_USER_AGENT_LENGTH]
+    ua_hash = hashlib.sha256(user_agent.encode()).digest()
+
+    ua_id = user_agent_ids.get(ua_hash)
+    if ua_id is not None:
+        return ua_id
+
+    ua_id = (await db.execute(USER_AGENT_LOOKUP, {"ua_hash": ua_hash})).scalar()
+    if ua_id is not None:
+        user_agent_ids[ua_hash] = ua_id
+        return ua_id
+
+    # A fresh row is only cached once a later lookup sees it, so a rolled
+    # back caller never leaves a dangling id behind
+    try:
+        async with db.begin_nested():
+            result = await db.execute(insert(UserAgent).values(ua_hash=ua_hash, ua=user_agent))
+        return result.inserted_primary_key[0]
+    except IntegrityError:
+        # Inserted concurrently by another request; None if this transaction's
+        # snapshot cannot see it yet
+        return (await db.execute(USER_AGENT_LOOKUP, {"ua_hash": ua_hash})).scalar()
@@ -0,0 +1,132 @@
+"""
+Write-behind cache for the denormalized user progress counters.
+Buffers stats updates in Redis and flushes them to MySQL in batches.
+"""
+import asyncio
+import logging
+from datetime import date
+from typing import Any, Dict, Optional
+
+from sqlalchemy import BigInteger, Date, Integer, bindparam, case, func, update
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.auth import invalidate_user_snapshot
+from app.core.config import settings
+from app.models.database import User
+
+try:
+    from redis import asyncio as redis_asyncio
+except ImportError:  # Redis is optional
+    redis_asyncio = None
+
+
+logger = logging.getLogger("wordmate.stats")
+
+STATS_KEY = "user:stats:{}"
+DIRTY_KEY = "user:stats:dirty"
+STATS_FIELDS = ("total_words_learned", "current_streak", "max_streak")
+
+# One executemany for the whole batch; absent fields keep their stored value
+# and max_streak only ever grows
+users_table = User.__table__
+_total = bindparam("total_words_learned", type_=Integer)
+_streak = bindparam("current_streak", type_=Integer)
+_max_streak = bindparam("max_streak", type_=Integer)
+FLUSH_STATEMENT = (
+    update(users_table)
+    .where(users_table.c.id == bindparam("user_id", type_=BigInteger))
+    .values(
+        total_words_learned=func.coalesce(_total, users_table.c.total_words_learned),
+        current_streak=func.coalesce(_streak, users_table.c.current_streak),
+        max_streak=case((_max_streak > users_table.c.max_streak, _max_streak), else_=users_table.c.max_streak),
+        last_active_date=func.coalesce(bindparam("last_active_date", type_=Date), users_table.c.last_active_date),
+    )
+)
+
+# Atomic "keep the larger value" for the buffered max_streak
+MAX_STREAK_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], 'max_streak')
+if (not current) or tonumber(ARGV[1]) > tonumber(current) then
+    redis.call('HSET', KEYS[1], 'max_streak', ARGV[1])
+end
+"""
+
+
+class UserStatsCache:
+    """Buffers user stats in Redis hashes until the next flush."""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    @classmethod
+    def from_settings(cls) -> Optional["UserStatsCache"]:
+        """Cache backed by REDIS_URL, or None when Redis is not configured."""
+        if not settings.REDIS_URL or redis_asyncio is None:
+            return None
+        return cls(redis_asyncio.from_url(settings.REDIS_URL, decode_responses=True))
+
+    async def record(self, user_id: int, stats: Dict[str, Any], active_on: date) -> None:
+        """Buffer the latest client-reported stats for a user."""
+        values = {field: int(stats[field]) for field in STATS_FIELDS if field in stats}
+        max_streak = values.pop("max_streak", None)
+        values["last_active_date"] = active_on.isoformat()
+
+        key = STATS_KEY.format(user_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=values)
+            if max_streak is not None:
+                pipe.eval(MAX_STREAK_SCRIPT, 1, key, max_streak)
+            pipe.sadd(DIRTY_KEY, user_id)
+            await pipe.execute()
+
+    async def flush(self, session_factory: async_sessionmaker) -> int:
+        """Write all buffered stats to the users table; returns rows flushed."""
+        user_ids = await self.client.spop(DIRTY_KEY, settings.USER_STATS_FLUSH_BATCH)
+        if not user_ids:
+            return 0
+
+        async with self.client.pipeline(transaction=True) as pipe:
+            for user_id in user_ids:
+                pipe.hgetall(STATS_KEY.format(user_id))
+                pipe.delete(STATS_KEY.format(user_id))
+            replies = await pipe.execute()
+
+        rows = []
+        for user_id, buffered in zip(user_ids, replies[::2]):
+            if not buffered:
+                continue
+            rows.append({
+                "user_id": int(user_id),
+                "total_words_learned": _int_or_none(buffered.get("total_words_learned")),
+                "current_streak": _int_or_none(buffered.get("current_streak")),
+                "max_streak": _int_or_none(buffered.get("max_streak")),
+                "last_active_date": date.fromisoformat(buffered["last_active_date"]),
+            })
+        if not rows:
+            return 0
+
+        async with session_factory() as db:
+            await db.execute(FLUSH_STATEMENT, rows)
+            await db.commit()
+
+        for row in rows:
+            invalidate_user_snapshot(row["user_id"])
+        return len(rows)
+
+    async def run_flusher(self, session_factory: async_sessionmaker) -> None:
+        """Background loop flushing buffered stats every USER_STATS_FLUSH_SECONDS."""
+        while True:
+            await asyncio.sleep(settings.USER_STATS_FLUSH_SECONDS)
+            try:
+                while await self.flush(session_factory) == settings.USER_STATS_FLUSH_BATCH:
+                    pass
+            except Exception:
+                logger.exception("Failed to flush user stats")
+
+
+def _int_or_none(value: Optional[str]) -> Optional[int]:
+    return int(value) if value is not None else None
+
+
+# Shared instance; None unless REDIS_URL is set
+user_stats_cache = UserStatsCache.from_settings()
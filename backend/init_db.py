@@ -5,7 +5,7 @@ Creates all tables and sets up the WordMate database.
 """
 import sys
 import asyncio
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
 
 from app.core.config import settings
 from app.db.database import engine, Base
@@ -57,17 +57,18 @@ async def create_tables():
     
     try:
         # Test database connection
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         print("✅ Database connection successful!")
         
         # Create all tables
-        Base.metadata.create_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
         print("✅ All tables created successfully!")
         
         # List created tables
-        with engine.connect() as conn:
-            result = conn.execute(text("SHOW TABLES"))
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SHOW TABLES"))
             tables = [row[0] for row in result]
             print(f"📋 Created tables: {', '.join(tables)}")
             
@@ -83,14 +84,25 @@ async def verify_setup():
     print("🔍 Verifying database setup...")
     
     try:
-        with engine.connect() as conn:
-            # Check each table exists and has correct structure
-            tables_to_check = ['users', 'user_words', 'sessions', 'session_answers', 'payments', 'events']
+        async with engine.connect() as conn:
+            # Check each table exists and count its columns in one round trip
+            tables_to_check = ['users', 'user_words', 'sessions', 'session_answers', 'payments', 'user_agents', 'events']
+            
+            result = await conn.execute(
+                text(
+                    "SELECT TABLE_NAME, COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS "
+                    "WHERE TABLE_SCHEMA = :db_name AND TABLE_NAME IN :tables "
+                    "GROUP BY TABLE_NAME"
+                ).bindparams(bindparam("tables", expanding=True)),
+                {"db_name": settings.MYSQL_DATABASE, "tables": tables_to_check}
+            )
+            column_counts = dict(result.all())
             
             for table in tables_to_check:
-                result = conn.execute(text(f"DESCRIBE {table}"))
-                columns = [row[0] for row in result]
-                print(f"✅ Table '{table}' has {len(columns)} columns")
+                if table not in column_counts:
+                    print(f"❌ Table '{table}' is missing")
+                    return False
+                print(f"✅ Table '{table}' has {column_counts[table]} columns")
             
             print("✅ Database verification completed!")
             return True
@@ -126,6 +138,8 @@ async def main():
         print("❌ Database verification failed. Exiting.")
         sys.exit(1)
     
+    await engine.dispose()
+    
     print()
     print("🎉 WordMate database initialization completed successfully!")
     print("🔥 Your backend is ready to rock!")
@@ -0,0 +1,18 @@
+-- One-shot migration: user_words.mastery_level / ease_factor from DECIMAL(3,1)
+-- to TINYINT UNSIGNED tenths (0.0-5.0 -> 0-50, 1.3-5.0 -> 13-50).
+-- Run once against an existing database, then re-create the procedures and
+-- views from schema.sql so they use the new scale.
+
+-- Scale in place while the columns are still DECIMAL(3,1); widen first so
+-- values up to 50.0 fit
+ALTER TABLE user_words
+    MODIFY mastery_level DECIMAL(4,1) DEFAULT 0.0,
+    MODIFY ease_factor DECIMAL(4,1) DEFAULT 2.5;
+
+UPDATE user_words
+SET mastery_level = ROUND(mastery_level * 10),
+    ease_factor = ROUND(ease_factor * 10);
+
+ALTER TABLE user_words
+    MODIFY mastery_level TINYINT UNSIGNED DEFAULT 0,
+    MODIFY ease_factor TINYINT UNSIGNED DEFAULT 25;
@@ -0,0 +1,16 @@
+-- One-shot migration: range-partition events by month of created_at.
+-- Partitioned tables cannot carry foreign keys and need the partition column
+-- in the primary key. Rebuilds the table; run in a maintenance window, then
+-- create RotateEventPartitions and the rotate_event_partitions event from
+-- schema.sql and CALL RotateEventPartitions(13) to add the monthly partitions.
+
+-- Foreign key name as generated by the original schema.sql
+ALTER TABLE events DROP FOREIGN KEY events_ibfk_1;
+
+ALTER TABLE events
+    MODIFY created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    DROP PRIMARY KEY,
+    ADD PRIMARY KEY (id, created_at)
+PARTITION BY RANGE (TO_DAYS(created_at)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
+);
@@ -0,0 +1,25 @@
+-- One-shot migration: store events.event_data as bytes and intern
+-- events.user_agent into user_agents.
+-- Existing JSON is kept as plain JSON text, which the application reads
+-- alongside the zstd-compressed payloads it writes from now on.
+
+CREATE TABLE user_agents (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    ua_hash BINARY(32) NOT NULL UNIQUE, -- SHA-256 of ua
+    ua TEXT NOT NULL
+);
+
+INSERT IGNORE INTO user_agents (ua_hash, ua)
+SELECT DISTINCT UNHEX(SHA2(LEFT(user_agent, 512), 256)), LEFT(user_agent, 512)
+FROM events
+WHERE user_agent IS NOT NULL AND user_agent != '';
+
+ALTER TABLE events
+    MODIFY event_data BLOB NULL,
+    ADD COLUMN user_agent_id INT NULL AFTER ip_address;
+
+UPDATE events e
+JOIN user_agents ua ON ua.ua_hash = UNHEX(SHA2(LEFT(e.user_agent, 512), 256))
+SET e.user_agent_id = ua.id;
+
+ALTER TABLE events DROP COLUMN user_agent;
@@ -0,0 +1,44 @@
+-- One-shot migration: users.id from VARCHAR(50) to a BIGINT surrogate key.
+-- The old string IDs move to users.external_id, which the API keeps
+-- returning. Child tables are rewritten through user_id_map. Access tokens
+-- issued before this migration stop validating; users log in again.
+
+-- Old string ID -> new numeric ID, numbered in registration order
+CREATE TABLE user_id_map (
+    new_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    old_id VARCHAR(50) NOT NULL UNIQUE
+);
+INSERT INTO user_id_map (old_id) SELECT id FROM users ORDER BY created_at, id;
+
+-- Foreign key names as generated by the original schema.sql
+ALTER TABLE user_words DROP FOREIGN KEY user_words_ibfk_1;
+ALTER TABLE sessions DROP FOREIGN KEY sessions_ibfk_1;
+ALTER TABLE payments DROP FOREIGN KEY payments_ibfk_1;
+
+ALTER TABLE users ADD COLUMN external_id VARCHAR(50) NULL AFTER id;
+UPDATE users SET external_id = id;
+
+-- Rewrite the keys as numeric strings first so the type change below keeps
+-- every existing index in place
+UPDATE users u JOIN user_id_map m ON u.id = m.old_id SET u.id = m.new_id;
+UPDATE user_words t JOIN user_id_map m ON t.user_id = m.old_id SET t.user_id = m.new_id;
+UPDATE sessions t JOIN user_id_map m ON t.user_id = m.old_id SET t.user_id = m.new_id;
+UPDATE payments t JOIN user_id_map m ON t.user_id = m.old_id SET t.user_id = m.new_id;
+UPDATE events t JOIN user_id_map m ON t.user_id = m.old_id SET t.user_id = m.new_id;
+
+ALTER TABLE users
+    MODIFY id BIGINT NOT NULL AUTO_INCREMENT,
+    MODIFY external_id VARCHAR(50) NOT NULL,
+    ADD UNIQUE INDEX external_id (external_id);
+ALTER TABLE user_words MODIFY user_id BIGINT NOT NULL;
+ALTER TABLE sessions MODIFY user_id BIGINT NOT NULL;
+ALTER TABLE payments MODIFY user_id BIGINT NOT NULL;
+ALTER TABLE events MODIFY user_id BIGINT NULL;
+
+ALTER TABLE user_words ADD FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE;
+ALTER TABLE sessions ADD FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE;
+ALTER TABLE payments ADD FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE;
+
+DROP TABLE user_id_map;
+
+-- Re-create the procedures and views from schema.sql (BIGINT user IDs)
@@ -0,0 +1,19 @@
+-- Drop indexes that another index already serves, so every write
+-- maintains fewer B-trees. Each dropped key is either a left prefix of a
+-- wider index on the same table or never used by a query.
+
+-- Covered by idx_user_words_review_cov / unused
+ALTER TABLE user_words
+    DROP INDEX idx_review_due,
+    DROP INDEX idx_last_review;
+
+-- Left prefix of idx_sessions_user_completed_compound, which also backs
+-- the user_id foreign key
+ALTER TABLE sessions DROP INDEX idx_user_completed;
+
+-- Left prefix of idx_session_word
+ALTER TABLE session_answers DROP INDEX idx_session;
+
+-- Same columns as the UNIQUE keys
+ALTER TABLE users DROP INDEX idx_email;
+ALTER TABLE payments DROP INDEX idx_trade_no;
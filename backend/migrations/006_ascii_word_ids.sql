@@ -0,0 +1,21 @@
+-- One-shot migration: store word_id as ASCII with a binary collation.
+-- Vocabulary keys ("younger_1") are ASCII, so this only changes the
+-- charset: one byte per character in the primary key and secondary
+-- indexes, bytewise comparisons, and smaller in-memory temp tables.
+-- Keys that differ only in letter case become distinct.
+
+-- Must return 0 before running the ALTERs below (strict mode rejects
+-- non-ASCII values)
+SELECT
+    (SELECT COUNT(*) FROM user_words WHERE word_id <> CONVERT(word_id USING ascii))
+  + (SELECT COUNT(*) FROM session_answers WHERE word_id <> CONVERT(word_id USING ascii))
+    AS non_ascii_word_ids;
+
+ALTER TABLE user_words
+    MODIFY word_id VARCHAR(100) CHARACTER SET ascii COLLATE ascii_bin NOT NULL;
+ALTER TABLE session_answers
+    MODIFY word_id VARCHAR(100) CHARACTER SET ascii COLLATE ascii_bin NOT NULL;
+
+-- Then re-create UpdateWordProgress from schema.sql: its p_word_id is
+-- now ASCII too. Compared against a utf8mb4 value, word_id would be
+-- converted and its index skipped.
@@ -12,9 +12,10 @@ USE wordmate;
 -- CORE TABLES (Optimized for Performance)
 -- =============================================
 
--- Users - Only registered users with email (string ID for external API)
+-- Users - Only registered users with email (BIGINT key, string external_id for the API)
 CREATE TABLE users (
-    id VARCHAR(50) PRIMARY KEY, -- Keep string ID for external API consistency
+    id BIGINT AUTO_INCREMENT PRIMARY KEY, -- Compact key for every FK and index
+    external_id VARCHAR(50) UNIQUE NOT NULL, -- Public string ID used by the API
     email VARCHAR(255) UNIQUE NOT NULL, 
     username VARCHAR(100) NOT NULL,
     password_hash VARCHAR(255) NOT NULL,
@@ -39,7 +40,7 @@ CREATE TABLE users (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     last_login_at TIMESTAMP NULL,
     
-    INDEX idx_email (email),
+    INDEX idx_username (username),
     INDEX idx_plan_expires (plan_expires_at),
     INDEX idx_last_active (last_active_date),
     INDEX idx_plan_status (plan_status)
@@ -47,13 +48,13 @@ CREATE TABLE users (
 
 -- User word progress - Composite PK for logical relationship
 CREATE TABLE user_words (
-    user_id VARCHAR(50) NOT NULL,
-    word_id VARCHAR(100) NOT NULL, -- References word ID in JSON files
+    user_id BIGINT NOT NULL,
+    word_id VARCHAR(100) CHARACTER SET ascii COLLATE ascii_bin NOT NULL, -- References word ID in JSON files
     
     -- Spaced repetition core data
-    mastery_level DECIMAL(3,1) DEFAULT 0.0, -- 0.0 to 5.0
+    mastery_level TINYINT UNSIGNED DEFAULT 0, -- tenths: 0 to 50 (0.0 to 5.0)
     repetitions INT DEFAULT 0,
-    ease_factor DECIMAL(3,1) DEFAULT 2.5,
+    ease_factor TINYINT UNSIGNED DEFAULT 25, -- tenths: 13 to 50 (1.3 to 5.0)
     last_review DATE NULL,
     next_review DATE NULL,
     
@@ -64,18 +65,14 @@ CREATE TABLE user_words (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     
     PRIMARY KEY (user_id, word_id),
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
-    
-    -- Optimized indexes for review queries
-    INDEX idx_review_due (user_id, next_review),
-    INDEX idx_mastery (user_id, mastery_level),
-    INDEX idx_last_review (user_id, last_review)
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    -- Review queries use idx_user_words_review_cov (see below)
 );
 
 -- Practice sessions - Auto-increment for performance
 CREATE TABLE sessions (
     id BIGINT AUTO_INCREMENT PRIMARY KEY, -- Fast integer PK
-    user_id VARCHAR(50) NOT NULL,
+    user_id BIGINT NOT NULL,
     practice_type ENUM('flashcard', 'typing', 'choice') NOT NULL,
     
     -- Results summary
@@ -89,21 +86,19 @@ CREATE TABLE sessions (
     
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     INDEX idx_user_date (user_id, started_at),
-    INDEX idx_completed (completed_at),
-    INDEX idx_user_completed (user_id, completed_at)
+    INDEX idx_completed (completed_at)
 );
 
 -- Session answers - Auto-increment for high performance
 CREATE TABLE session_answers (
     id BIGINT AUTO_INCREMENT PRIMARY KEY, -- Fast integer PK
     session_id BIGINT NOT NULL, -- References sessions.id
-    word_id VARCHAR(100) NOT NULL, -- References JSON vocabulary
+    word_id VARCHAR(100) CHARACTER SET ascii COLLATE ascii_bin NOT NULL, -- References JSON vocabulary
     is_correct BOOLEAN NOT NULL,
     response_time_ms INT DEFAULT 0,
     quality_score TINYINT DEFAULT 0, -- 0-5 for spaced repetition
     
     FOREIGN KEY (session_id) REFERENCES sessions(id) ON DELETE CASCADE,
-    INDEX idx_session (session_id),
     INDEX idx_word_performance (word_id, is_correct),
     INDEX idx_session_word (session_id, word_id)
 );
@@ -111,7 +106,7 @@ CREATE TABLE session_answers (
 -- Payments - Auto-increment with string trade numbers for gateways
 CREATE TABLE payments (
     id BIGINT AUTO_INCREMENT PRIMARY KEY, -- Fast integer PK for internal use
-    user_id VARCHAR(50) NOT NULL,
+    user_id BIGINT NOT NULL,
     amount DECIMAL(8,2) NOT NULL,
     currency VARCHAR(10) DEFAULT 'CNY',
     method ENUM('alipay', 'wechat') NOT NULL,
@@ -127,26 +122,39 @@ CREATE TABLE payments (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     INDEX idx_user (user_id),
     INDEX idx_status (status),
-    INDEX idx_trade_no (out_trade_no),
     INDEX idx_created (created_at)
 );
 
+-- Distinct User-Agent strings, interned so events carry a small id
+CREATE TABLE user_agents (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    ua_hash BINARY(32) NOT NULL UNIQUE, -- SHA-256 of ua
+    ua TEXT NOT NULL
+);
+
 -- System events - Auto-increment for high-volume logging
+-- Range-partitioned by month so the hot index pages stay small and old
+-- months are purged with DROP PARTITION (see RotateEventPartitions).
+-- Partitioned tables cannot have foreign keys, and the partition column
+-- must be part of the primary key.
 CREATE TABLE events (
-    id BIGINT AUTO_INCREMENT PRIMARY KEY, -- Fast integer PK
-    user_id VARCHAR(50) NULL, -- NULL for anonymous users
+    id BIGINT AUTO_INCREMENT, -- Fast integer PK
+    user_id BIGINT NULL, -- NULL for anonymous users
     anonymous_session_id VARCHAR(100) NULL, -- Track anonymous users
     event_type ENUM('anonymous_trial', 'registration', 'login', 'payment', 'session', 'sync', 'error') NOT NULL,
-    event_data JSON NULL,
+    event_data BLOB NULL, -- zstd-compressed JSON, or plain JSON when that is smaller
     ip_address VARCHAR(45) NULL,
-    user_agent TEXT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    
-    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL,
+    user_agent_id INT NULL, -- References user_agents
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    PRIMARY KEY (id, created_at),
     INDEX idx_user_type (user_id, event_type),
     INDEX idx_anonymous_session (anonymous_session_id, event_type),
     INDEX idx_created (created_at),
     INDEX idx_event_type (event_type)
+)
+PARTITION BY RANGE (TO_DAYS(created_at)) (
+    PARTITION p_future VALUES LESS THAN MAXVALUE
 );
 
 -- =============================================
@@ -156,14 +164,14 @@ CREATE TABLE events (
 DELIMITER //
 
 -- Get words for review (references JSON vocabulary by ID)
-CREATE PROCEDURE GetWordsForReview(IN p_user_id VARCHAR(50), IN p_limit INT)
+CREATE PROCEDURE GetWordsForReview(IN p_user_id BIGINT, IN p_limit INT)
 BEGIN
     -- Return word IDs that need review - app loads definitions from JSON
-    SELECT word_id, mastery_level, last_review, seen_count
+    SELECT word_id, mastery_level / 10 AS mastery_level, last_review, seen_count
     FROM user_words 
     WHERE user_id = p_user_id
       AND (next_review IS NULL OR next_review <= CURDATE())
-      AND mastery_level < 4.0
+      AND mastery_level < 40
     ORDER BY mastery_level ASC, last_review ASC
     LIMIT p_limit;
     
@@ -173,8 +181,8 @@ END//
 
 -- Update word progress after practice
 CREATE PROCEDURE UpdateWordProgress(
-    IN p_user_id VARCHAR(50),
-    IN p_word_id VARCHAR(100),
+    IN p_user_id BIGINT,
+    IN p_word_id VARCHAR(100) CHARACTER SET ascii, -- Same charset as word_id, or the index is skipped
     IN p_is_correct BOOLEAN,
     IN p_new_mastery DECIMAL(3,1),
     IN p_new_ease DECIMAL(3,1),
@@ -185,12 +193,12 @@ BEGIN
         user_id, word_id, mastery_level, repetitions, ease_factor, 
         last_review, next_review, seen_count, correct_count
     ) VALUES (
-        p_user_id, p_word_id, p_new_mastery, 1, p_new_ease,
+        p_user_id, p_word_id, ROUND(p_new_mastery * 10), 1, ROUND(p_new_ease * 10),
         CURDATE(), p_next_review, 1, IF(p_is_correct, 1, 0)
     ) ON DUPLICATE KEY UPDATE
-        mastery_level = p_new_mastery,
+        mastery_level = ROUND(p_new_mastery * 10),
         repetitions = repetitions + 1,
-        ease_factor = p_new_ease,
+        ease_factor = ROUND(p_new_ease * 10),
         last_review = CURDATE(),
         next_review = p_next_review,
         seen_count = seen_count + 1,
@@ -201,7 +209,7 @@ END//
 -- Complete a practice session and update user stats
 CREATE PROCEDURE CompleteSession(
     IN p_session_id BIGINT, -- Now integer
-    IN p_user_id VARCHAR(50),
+    IN p_user_id BIGINT,
     IN p_words_count INT,
     IN p_correct_count INT,
     IN p_duration INT
@@ -233,7 +241,7 @@ BEGIN
     UPDATE users 
     SET total_words_learned = (
             SELECT COUNT(*) FROM user_words 
-            WHERE user_id = p_user_id AND mastery_level >= 2.0
+            WHERE user_id = p_user_id AND mastery_level >= 20
         ),
         current_streak = CASE 
             WHEN v_practiced_today THEN current_streak
@@ -255,7 +263,7 @@ END//
 
 -- Start a new practice session (returns session ID)
 CREATE PROCEDURE StartSession(
-    IN p_user_id VARCHAR(50),
+    IN p_user_id BIGINT,
     IN p_practice_type VARCHAR(20),
     OUT p_session_id BIGINT
 )
@@ -268,7 +276,7 @@ END//
 
 -- Import anonymous trial data during registration
 CREATE PROCEDURE ImportTrialProgress(
-    IN p_user_id VARCHAR(50),
+    IN p_user_id BIGINT,
     IN p_trial_words JSON,
     IN p_trial_stats JSON
 )
@@ -290,8 +298,8 @@ BEGIN
             INSERT IGNORE INTO user_words (
                 user_id, word_id, mastery_level, seen_count, correct_count, ease_factor
             ) VALUES (
-                p_user_id, @word_id, IFNULL(@mastery, 0), IFNULL(@seen, 0), 
-                IFNULL(@correct, 0), IFNULL(@ease, 2.5)
+                p_user_id, @word_id, IFNULL(ROUND(@mastery * 10), 0), IFNULL(@seen, 0), 
+                IFNULL(@correct, 0), IFNULL(ROUND(@ease * 10), 25)
             );
             
             SET i = i + 1;
@@ -324,7 +332,7 @@ CREATE PROCEDURE ProcessPayment(
     IN p_gateway_txn_id VARCHAR(200)
 )
 BEGIN
-    DECLARE v_user_id VARCHAR(50);
+    DECLARE v_user_id BIGINT;
     DECLARE v_amount DECIMAL(8,2);
     DECLARE v_plan VARCHAR(50);
     DECLARE v_expires TIMESTAMP;
@@ -362,6 +370,7 @@ BEGIN
     WHERE id = v_user_id;
     
     -- Log payment success
+    -- Stored as plain JSON bytes; the application reads both forms
     INSERT INTO events (user_id, event_type, event_data)
     VALUES (v_user_id, 'payment', JSON_OBJECT(
         'payment_id', p_payment_id,
@@ -375,7 +384,7 @@ END//
 CREATE PROCEDURE FindPaymentByTradeNo(
     IN p_out_trade_no VARCHAR(200),
     OUT p_payment_id BIGINT,
-    OUT p_user_id VARCHAR(50)
+    OUT p_user_id BIGINT
 )
 BEGIN
     SELECT id, user_id INTO p_payment_id, p_user_id
@@ -418,8 +427,51 @@ BEGIN
     ANALYZE TABLE users, user_words, sessions, session_answers, payments, events;
 END//
 
+-- Monthly events partition rotation: split p_future so monthly partitions
+-- exist three months ahead, then drop months older than p_keep_months
+CREATE PROCEDURE RotateEventPartitions(IN p_keep_months INT)
+BEGIN
+    DECLARE v_next DATE;
+    DECLARE v_horizon DATE DEFAULT DATE_FORMAT(CURDATE() + INTERVAL 3 MONTH, '%Y-%m-01');
+    DECLARE v_cutoff INT DEFAULT TO_DAYS(DATE_FORMAT(CURDATE() - INTERVAL p_keep_months MONTH, '%Y-%m-01'));
+    DECLARE v_expired TEXT;
+
+    -- Upper bound of the newest monthly partition
+    SELECT FROM_DAYS(MAX(CAST(PARTITION_DESCRIPTION AS UNSIGNED))) INTO v_next
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'events'
+      AND PARTITION_NAME != 'p_future';
+    SET v_next = IFNULL(v_next, DATE_FORMAT(CURDATE(), '%Y-%m-01'));
+
+    WHILE v_next < v_horizon DO
+        SET @ddl = CONCAT(
+            'ALTER TABLE events REORGANIZE PARTITION p_future INTO (',
+            'PARTITION p', DATE_FORMAT(v_next, '%Y%m'),
+            ' VALUES LESS THAN (TO_DAYS(''', v_next + INTERVAL 1 MONTH, ''')), ',
+            'PARTITION p_future VALUES LESS THAN MAXVALUE)'
+        );
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+        SET v_next = v_next + INTERVAL 1 MONTH;
+    END WHILE;
+
+    -- Whole expired months go as a metadata operation, not row-by-row DELETE
+    SELECT GROUP_CONCAT(PARTITION_NAME) INTO v_expired
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'events'
+      AND PARTITION_NAME != 'p_future'
+      AND CAST(PARTITION_DESCRIPTION AS UNSIGNED) <= v_cutoff;
+    IF v_expired IS NOT NULL THEN
+        SET @ddl = CONCAT('ALTER TABLE events DROP PARTITION ', v_expired);
+        PREPARE stmt FROM @ddl;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    END IF;
+END//
+
 -- Generate user statistics
-CREATE PROCEDURE GetUserStats(IN p_user_id VARCHAR(50))
+CREATE PROCEDURE GetUserStats(IN p_user_id BIGINT)
 BEGIN
     SELECT 
         u.username,
@@ -444,16 +496,16 @@ BEGIN
 END//
 
 -- Get full user progress for sync (used after login)
-CREATE PROCEDURE GetUserProgressForSync(IN p_user_id VARCHAR(50))
+CREATE PROCEDURE GetUserProgressForSync(IN p_user_id BIGINT)
 BEGIN
     -- Get user basic info
-    SELECT id, username, email, grade, total_words_learned, 
+    SELECT id, external_id, username, email, grade, total_words_learned, 
            current_streak, max_streak, last_active_date,
            plan, plan_status, plan_expires_at
     FROM users WHERE id = p_user_id;
     
     -- Get word progress
-    SELECT word_id, mastery_level, repetitions, ease_factor,
+    SELECT word_id, mastery_level / 10 AS mastery_level, repetitions, ease_factor / 10 AS ease_factor,
            last_review, next_review, seen_count, correct_count
     FROM user_words WHERE user_id = p_user_id;
     
@@ -516,7 +568,7 @@ SELECT
     ROUND(COUNT(CASE WHEN registered_from_trial = TRUE THEN 1 END) / COUNT(*) * 100, 2) as conversion_rate
 FROM users 
 WHERE created_at >= DATE_SUB(NOW(), INTERVAL 30 DAY)
-  AND id != '__system__'
+  AND external_id != '__system__'
 GROUP BY DATE(created_at)
 ORDER BY registration_date DESC;
 
@@ -525,9 +577,9 @@ CREATE VIEW v_word_difficulty_analysis AS
 SELECT 
     word_id,
     COUNT(DISTINCT user_id) as learners_count,
-    AVG(mastery_level) as avg_mastery,
+    AVG(mastery_level) / 10 as avg_mastery,
     ROUND(AVG(CASE WHEN seen_count > 0 THEN correct_count / seen_count ELSE 0 END) * 100, 2) as success_rate,
-    COUNT(CASE WHEN mastery_level >= 2.0 THEN 1 END) as mastered_count
+    COUNT(CASE WHEN mastery_level >= 20 THEN 1 END) as mastered_count
 FROM user_words
 WHERE seen_count > 0
 GROUP BY word_id
@@ -559,7 +611,7 @@ FROM payments;
 -- =============================================
 
 -- Default system config user (for admin operations)
-INSERT INTO users (id, username, email, password_hash, grade) 
+INSERT INTO users (external_id, username, email, password_hash, grade) 
 VALUES ('__system__', 'System', 'admin@wordmate.app', 'unused', 'admin');
 
 -- =============================================
@@ -567,10 +619,19 @@ VALUES ('__system__', 'System', 'admin@wordmate.app', 'unused', 'admin');
 -- =============================================
 
 -- Compound indexes for optimal query performance
-CREATE INDEX idx_user_words_review_compound ON user_words(user_id, next_review, mastery_level);
+-- Covers the review-due query (word_id is part of the primary key)
+CREATE INDEX idx_user_words_review_cov ON user_words(user_id, mastery_level, last_review, next_review, repetitions, seen_count);
 CREATE INDEX idx_sessions_user_completed_compound ON sessions(user_id, completed_at, started_at);
 CREATE INDEX idx_session_answers_performance ON session_answers(session_id, is_correct, response_time_ms);
 
+-- Create the first monthly events partitions and keep rotating them
+-- (needs event_scheduler=ON). Events are kept for 13 months;
+-- DailyMaintenance still trims most types after 90 days.
+CALL RotateEventPartitions(13);
+CREATE EVENT rotate_event_partitions
+    ON SCHEDULE EVERY 1 MONTH STARTS DATE_FORMAT(CURDATE() + INTERVAL 1 MONTH, '%Y-%m-01')
+    DO CALL RotateEventPartitions(13);
+
 -- Final table optimization
 ANALYZE TABLE users, user_words, sessions, session_answers, payments, events;
 
@@ -8,22 +8,31 @@ import sys
 import getpass
 from pathlib import Path
 
-def run_mysql_command(command, password=None):
-    """Run a MySQL command."""
-    if password:
-        cmd = f'mysql -u root -p{password} -e "{command}"'
-    else:
-        cmd = f'mysql -u root -e "{command}"'
-    
+import pymysql
+
+def run_mysql_commands(commands, password=None):
+    """Run MySQL statements as root over a single connection."""
     try:
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        if result.returncode != 0:
-            print(f"❌ Error: {result.stderr}")
-            return False
+        conn = pymysql.connect(
+            host="localhost",
+            user="root",
+            password=password or "",
+            autocommit=True
+        )
+    except pymysql.MySQLError as e:
+        print(f"❌ Error connecting to MySQL: {e}")
+        return False
+
+    try:
+        with conn.cursor() as cur:
+            for command in commands:
+                cur.execute(command)
         return True
-    except Exception as e:
-        print(f"❌ Error running command: {e}")
+    except pymysql.MySQLError as e:
+        print(f"❌ Error: {e}")
         return False
+    finally:
+        conn.close()
 
 def main():
     print("🚀 WordMate Database Quick Setup")
@@ -48,13 +57,7 @@ def main():
         "FLUSH PRIVILEGES;"
     ]
     
-    success = True
-    for cmd in commands:
-        if not run_mysql_command(cmd, root_password):
-            success = False
-            break
-    
-    if not success:
+    if not run_mysql_commands(commands, root_password):
         print("❌ Failed to set up database. Please check your MySQL configuration.")
         sys.exit(1)
     
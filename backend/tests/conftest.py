@@ -0,0 +1,14 @@
+"""
+Test bootstrap shared by every test module.
+pytest imports this before any test module, so the environment is set
+before the first import of the app reads settings.
+"""
+import os
+
+# Set test environment
+os.environ["ENV_FILE"] = ".env.test"
+os.environ["APP_ENV"] = "test"
+# Cheapest valid Argon2id parameters; the same code path runs, hashing
+# cost is just not what these tests measure
+os.environ["ARGON2_MEMORY_KIB"] = "8"
+os.environ["ARGON2_TIME_COST"] = "1"
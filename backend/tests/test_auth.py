@@ -2,61 +2,196 @@
 Test authentication APIs.
 Tests user registration, login, and JWT token handling.
 """
+import asyncio
 import os
+import sqlite3
+from datetime import date, timedelta
+from typing import Any, Dict, NamedTuple
+import httpx
+import numpy as np
+import orjson
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from pydantic import ValidationError
+from sqlalchemy import PrimaryKeyConstraint, UniqueConstraint, create_engine, insert
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
-
-# Set test environment
-os.environ["ENV_FILE"] = ".env.test"
+from sqlalchemy.pool import NullPool
+from sqlalchemy.schema import CreateIndex, CreateTable
 
+# Test environment variables are set in conftest.py, before this import
 from app.main import app
-from app.db.database import get_db, Base
+from app.db.database import get_db, get_sessionmaker, count_queries, Base
 from app.core.config import settings
+from app.core.responses import UTCJSONResponse
+from app.core.auth import (
+    create_user_token, generate_user_id, get_current_user_id, hash_password, legacy_pwd_context,
+    revoked_tokens, token_digest, token_payload_cache, user_snapshot_cache
+)
+from app.models.database import (
+    User, UserWord, Session as DBSession, SessionAnswer, Event, UserAgent
+)
+from app.schemas import (
+    AuthResponse, ProgressSyncData, SessionComplete, UserResponseWrapper, validate_words
+)
+from app.services.event_logger import event_logger
+from app.services.progress_service import RECENT_SESSIONS_QUERY, REVIEW_DUE_QUERY, ProgressService
+from app.services.review_rescheduler import reschedule_reviews
+from app.services.scheduler import Schedule, _schedule_loop, schedule_reviews
+from app.services.user_agents import intern_user_agent, user_agent_ids
 
 
-# Test database setup
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Test database setup: one named in-memory database shared by every
+# connection in the process, so tests never touch the filesystem. Each
+# pytest-xdist worker is its own process with its own database.
+TEST_DB_URI = f"file:wordmate_test_{os.environ.get('PYTEST_XDIST_WORKER', 'gw0')}?mode=memory&cache=shared"
+SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DB_URI}&uri=true"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+# A shared in-memory database lives as long as some connection to it is
+# open; this one is held for the whole run
+keepalive = sqlite3.connect(TEST_DB_URI, uri=True)
 
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Each test runs the app on its own event loop; NullPool keeps aiosqlite
+# connections from being shared across loops
+engine = create_async_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
 
+TestingSessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
-def override_get_db():
+# Sync access to the same database for schema setup and direct row checks
+sync_engine = create_engine(f"sqlite:///{TEST_DB_URI}&uri=true", poolclass=NullPool)
+
+SyncSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=sync_engine)
+
+
+async def override_get_db():
     """Override database dependency for testing."""
-    try:
-        db = TestingSessionLocal()
+    async with TestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_sessionmaker] = lambda: TestingSessionLocal
+
 
-client = TestClient(app)
+def jload(response: httpx.Response) -> Any:
+    """Decode a response body with orjson (the app encodes with it too)."""
+    return orjson.loads(response.content)
+
+
+@pytest.fixture(scope="module")
+def async_client():
+    """
+    One ASGI client reused by every test in the module. ASGITransport keeps
+    no connections, so the client is safe across the tests' event loops.
+    """
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    yield client
+    asyncio.run(client.aclose())
+
+
+# The schema as single scripts, so setup and teardown are one executescript
+# call each rather than a statement (and existence check) per table
+CREATE_SCHEMA = "".join(
+    f"{ddl.compile(sync_engine)};\n"
+    for table in Base.metadata.sorted_tables
+    for ddl in [CreateTable(table), *(CreateIndex(index) for index in table.indexes)]
+)
+DROP_SCHEMA = "".join(
+    f"DROP TABLE IF EXISTS {table.name};\n" for table in reversed(Base.metadata.sorted_tables)
+)
+# Children before parents, all in one transaction
+CLEAR_TABLES = "BEGIN;\n" + "".join(
+    f"DELETE FROM {table.name};\n" for table in reversed(Base.metadata.sorted_tables)
+) + "COMMIT;\n"
+
+
+@pytest.fixture(scope="module")
+def test_schema():
+    """Create test database tables once for the module."""
+    keepalive.executescript(DROP_SCHEMA + CREATE_SCHEMA)
+    yield
+    keepalive.executescript(DROP_SCHEMA)
 
 
 @pytest.fixture(scope="function")
-def test_db():
-    """Create test database tables."""
-    # Drop and recreate tables for clean state
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+def test_db(test_schema):
+    """Empty every table and in-process cache for a clean state."""
+    # The app commits through its own connections, so a rolled-back outer
+    # transaction can't isolate tests; deleting the rows is still far
+    # cheaper than dropping and recreating the schema
+    keepalive.executescript(CLEAR_TABLES)
+    token_payload_cache.clear()
+    user_snapshot_cache.clear()
+    revoked_tokens.clear()
+    while not event_logger.queue.empty():
+        event_logger.queue.get_nowait()
     yield
-    Base.metadata.drop_all(bind=engine)
+
+
+# Credentials of the user most tests need to exist
+SHARED_USER = {
+    "username": "loginuser",
+    "email": "login@example.com",
+    "password": "loginpassword123",
+    "grade": "grade6"
+}
+SHARED_LOGIN = {"email": SHARED_USER["email"], "password": SHARED_USER["password"]}
+# Hashed once for every user make_user() inserts
+SHARED_PASSWORD_HASH = hash_password(SHARED_USER["password"])
+
+
+# Headers for the invalid-token cases, built once
+INVALID_TOKEN_HEADERS = {"Authorization": "Bearer invalid_token"}
+
+
+class FixtureUser(NamedTuple):
+    """A user inserted by make_user(), with its bearer headers prebuilt."""
+    id: int
+    token: str
+    headers: Dict[str, str]
+
+
+def make_user(**overrides) -> FixtureUser:
+    """
+    Insert a user (SHARED_USER unless overridden) with one INSERT, skipping
+    the /register request.
+    """
+    values = {
+        "external_id": generate_user_id(),
+        "username": SHARED_USER["username"],
+        "email": SHARED_USER["email"],
+        "grade": SHARED_USER["grade"],
+        "password_hash": SHARED_PASSWORD_HASH,
+        **overrides,
+    }
+    with sync_engine.begin() as conn:
+        user_id = conn.execute(insert(User).values(values)).inserted_primary_key[0]
+    token = create_user_token(User(id=user_id, email=values["email"], username=values["username"]))
+    return FixtureUser(user_id, token, {"Authorization": f"Bearer {token}"})
+
+
+@pytest.fixture(scope="function")
+def auth_user(test_db):
+    """SHARED_USER, inserted directly."""
+    return make_user()
+
+
+def query_plan(statement, **params):
+    """SQLite's EXPLAIN QUERY PLAN steps for a statement with bound values."""
+    compiled = statement.compile(sync_engine)
+    values = compiled.construct_params(params)
+    with sync_engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compiled}", tuple(values[key] for key in compiled.positiontup)
+        )
+        return [row[-1] for row in rows]
 
 
 class TestAuthenticationAPI:
     """Test authentication endpoints."""
     
-    def test_register_new_user(self, test_db):
+    @pytest.mark.asyncio
+    async def test_register_new_user(self, test_db, async_client):
         """Test successful user registration."""
         user_data = {
             "username": "testuser",
@@ -65,26 +200,20 @@ class TestAuthenticationAPI:
             "grade": "grade6"
         }
         
-        response = client.post("/api/v1/auth/register", json=user_data)
+        response = await async_client.post("/api/v1/auth/register", json=user_data)
         
         assert response.status_code == 200
-        data = response.json()
+        # Shape and types checked in one pass by the response model's validator
+        body = AuthResponse.model_validate_json(response.content)
+        assert (body.success, body.message) == (True, "Registration successful")
         
-        assert data["success"] is True
-        assert data["message"] == "Registration successful"
-        assert "data" in data
-        assert "user" in data["data"]
-        assert "token" in data["data"]
-        
-        user = data["data"]["user"]
-        assert user["username"] == "testuser"
-        assert user["email"] == "test@example.com"
-        assert user["grade"] == "grade6"
-        assert user["registered_from_trial"] is False
-        assert "id" in user
-        assert user["id"].startswith("user_")
+        user = body.data.user
+        assert (user.username, user.email, user.grade) == ("testuser", "test@example.com", "grade6")
+        assert user.registered_from_trial is False
+        assert user.id.startswith("user_")
     
-    def test_register_with_trial_data(self, test_db):
+    @pytest.mark.asyncio
+    async def test_register_with_trial_data(self, test_db, async_client):
         """Test user registration with trial data import."""
         trial_data = {
             "words": [
@@ -93,9 +222,16 @@ class TestAuthenticationAPI:
                     "mastery_level": 2.5,
                     "repetitions": 3,
                     "ease_factor": 2.8,
+                    "last_review": "2024-03-01T10:00:00Z",
                     "seen_count": 5,
                     "correct_count": 3
-                }
+                },
+                # Skipped, the rest still imports
+                {"word_id": "bad", "mastery_level": "not a number"},
+                {"word_id": "苹果"}
+            ],
+            "sessions": [
+                {"practice_type": "typing", "words_count": 3, "correct_count": 2, "accuracy": 66.7}
             ],
             "stats": {
                 "total_words_learned": 1,
@@ -112,43 +248,52 @@ class TestAuthenticationAPI:
             "trial_data": trial_data
         }
         
-        response = client.post("/api/v1/auth/register", json=user_data)
+        response = await async_client.post("/api/v1/auth/register", json=user_data)
         
         assert response.status_code == 200
-        data = response.json()
+        data = jload(response)
         
         assert data["success"] is True
         user = data["data"]["user"]
         assert user["registered_from_trial"] is True
         assert user["total_words_learned"] == 1
         assert user["current_streak"] == 2
+
+        # Word progress is imported by a background task after the response
+        db = SyncSessionLocal()
+        try:
+            user_id = get_current_user_id(data["data"]["token"])
+            words = db.query(UserWord).filter(UserWord.user_id == user_id).all()
+            assert [word.word_id for word in words] == ["apple"]
+            # Stored as fixed-point tenths, read back as floats
+            assert (words[0].mastery_level_x10, words[0].ease_factor_x10) == (25, 28)
+            assert (words[0].mastery_level, words[0].ease_factor) == (2.5, 2.8)
+            assert words[0].last_review == date(2024, 3, 1)
+
+            sessions = db.query(DBSession).filter(DBSession.user_id == user_id).all()
+            assert [(s.practice_type, s.correct_count, s.accuracy) for s in sessions] == [("typing", 2, 66.7)]
+            assert sessions[0].started_at is not None
+        finally:
+            db.close()
     
-    def test_register_duplicate_email(self, test_db):
+    @pytest.mark.asyncio
+    async def test_register_duplicate_email(self, test_db, async_client):
         """Test registration with duplicate email."""
-        user_data = {
-            "username": "testuser1",
-            "email": "duplicate@example.com",
-            "password": "password123",
-            "grade": "grade6"
-        }
-        
         # First registration should succeed
-        response1 = client.post("/api/v1/auth/register", json=user_data)
+        response1 = await async_client.post("/api/v1/auth/register", json=SHARED_USER)
         assert response1.status_code == 200
         
         # Second registration with same email should fail
-        user_data["username"] = "testuser2"
-        response2 = client.post("/api/v1/auth/register", json=user_data)
+        response2 = await async_client.post(
+            "/api/v1/auth/register", json=dict(SHARED_USER, username="testuser2")
+        )
         
-        # The duplicate email check may return 400 or 500 depending on implementation
-        assert response2.status_code in [400, 500]
-        data = response2.json()
-        if response2.status_code == 400:
-            assert "Email already registered" in data["detail"]
-        else:  # 500 error
-            assert "email" in data.get("detail", "Email already registered").lower()
+        assert response2.status_code == 400
+        data = jload(response2)
+        assert "Email already registered" in data["error"]["message"]
     
-    def test_register_invalid_data(self, test_db):
+    @pytest.mark.asyncio
+    async def test_register_invalid_data(self, test_db, async_client):
         """Test registration with invalid data."""
         # Missing required fields
         invalid_data = {
@@ -157,126 +302,530 @@ class TestAuthenticationAPI:
             "password": "123",  # Too short password
         }
         
-        response = client.post("/api/v1/auth/register", json=invalid_data)
+        response = await async_client.post("/api/v1/auth/register", json=invalid_data)
         assert response.status_code == 422  # Validation error
     
-    def test_login_success(self, test_db):
+    @pytest.mark.asyncio
+    async def test_login_success(self, auth_user, async_client):
         """Test successful user login."""
-        # First register a user
-        register_data = {
-            "username": "loginuser",
-            "email": "login@example.com",
-            "password": "loginpassword123",
-            "grade": "grade6"
-        }
-        client.post("/api/v1/auth/register", json=register_data)
-        
-        # Then login
-        login_data = {
-            "email": "login@example.com",
-            "password": "loginpassword123"
-        }
-        
-        response = client.post("/api/v1/auth/login", json=login_data)
+        response = await async_client.post("/api/v1/auth/login", json=SHARED_LOGIN)
         
         assert response.status_code == 200
-        data = response.json()
-        
-        assert data["success"] is True
-        assert data["message"] == "Login successful"
-        assert "data" in data
-        assert "user" in data["data"]
-        assert "token" in data["data"]
-        
-        user = data["data"]["user"]
-        assert user["username"] == "loginuser"
-        assert user["email"] == "login@example.com"
-    
-    def test_login_invalid_email(self, test_db):
+        body = AuthResponse.model_validate_json(response.content)
+        assert (body.success, body.message) == (True, "Login successful")
+        assert (body.data.user.username, body.data.user.email) == ("loginuser", "login@example.com")
+
+    @pytest.mark.asyncio
+    async def test_login_upgrades_legacy_bcrypt_hash(self, test_db, async_client):
+        """Test login accepts a legacy bcrypt hash and rehashes it with Argon2id."""
+        # Minimum bcrypt cost; verify reads the cost from the hash
+        make_user(password_hash=legacy_pwd_context.copy(bcrypt__rounds=4).hash(SHARED_USER["password"]))
+
+        response = await async_client.post("/api/v1/auth/login", json=SHARED_LOGIN)
+        assert response.status_code == 200
+
+        db = SyncSessionLocal()
+        try:
+            user = db.query(User).filter(User.email == SHARED_USER["email"]).one()
+            assert user.password_hash.startswith("$argon2id$")
+        finally:
+            db.close()
+
+    @pytest.mark.asyncio
+    async def test_login_query_count(self, test_db, async_client):
+        """Test login stays within a fixed number of SQL statements."""
+        make_user()
+
+        with count_queries(engine.sync_engine) as queries:
+            response = await async_client.post("/api/v1/auth/login", json=SHARED_LOGIN)
+        assert response.status_code == 200
+        # Credential lookup, user load, user update; the event is queued
+        assert len(queries) <= 3
+
+    def test_implicit_relationship_load_raises(self, test_db):
+        """Test undeclared relationship loads raise in the test environment."""
+        user_id = make_user().id
+
+        db = SyncSessionLocal()
+        try:
+            user = db.get(User, user_id)
+            with pytest.raises(InvalidRequestError):
+                user.user_words
+        finally:
+            db.close()
+
+    @pytest.mark.asyncio
+    async def test_login_invalid_email(self, test_db, async_client):
         """Test login with non-existent email."""
         login_data = {
             "email": "nonexistent@example.com",
             "password": "password123"
         }
         
-        response = client.post("/api/v1/auth/login", json=login_data)
+        response = await async_client.post("/api/v1/auth/login", json=login_data)
         
         assert response.status_code == 401
-        data = response.json()
+        data = jload(response)
         # Check if it's using our custom error format or default HTTPException format
         if "error" in data:
             assert "Invalid email or password" in data["error"]["message"]
         else:
             assert "Invalid email or password" in data["detail"]
     
-    def test_login_invalid_password(self, test_db):
+    @pytest.mark.asyncio
+    async def test_login_invalid_password(self, auth_user, async_client):
         """Test login with wrong password."""
-        # Register user first
-        register_data = {
-            "username": "passworduser",
-            "email": "password@example.com",
-            "password": "correctpassword123",
-            "grade": "grade6"
-        }
-        client.post("/api/v1/auth/register", json=register_data)
-        
         # Login with wrong password
         login_data = {
-            "email": "password@example.com",
+            "email": SHARED_USER["email"],
             "password": "wrongpassword"
         }
         
-        response = client.post("/api/v1/auth/login", json=login_data)
+        response = await async_client.post("/api/v1/auth/login", json=login_data)
         
         assert response.status_code == 401
-        data = response.json()
+        data = jload(response)
         # Check if it's using our custom error format or default HTTPException format
         if "error" in data:
             assert "Invalid email or password" in data["error"]["message"]
         else:
             assert "Invalid email or password" in data["detail"]
     
-    def test_get_current_user(self, test_db):
+    @pytest.mark.asyncio
+    async def test_get_current_user(self, auth_user, async_client):
         """Test getting current user info with valid token."""
-        # Register and get token
-        register_data = {
-            "username": "currentuser",
-            "email": "current@example.com",
-            "password": "currentpassword123",
-            "grade": "grade6"
-        }
-        register_response = client.post("/api/v1/auth/register", json=register_data)
-        token = register_response.json()["data"]["token"]
-        
-        # Get current user info
-        headers = {"Authorization": f"Bearer {token}"}
-        response = client.get("/api/v1/auth/me", headers=headers)
+        response = await async_client.get("/api/v1/auth/me", headers=auth_user.headers)
         
         assert response.status_code == 200
-        data = response.json()
-        
-        assert data["success"] is True
-        assert "data" in data
-        user = data["data"]
-        assert user["username"] == "currentuser"
-        assert user["email"] == "current@example.com"
-    
-    def test_get_current_user_invalid_token(self, test_db):
+        body = UserResponseWrapper.model_validate_json(response.content)
+        assert body.success is True
+        assert (body.data.username, body.data.email) == ("loginuser", "login@example.com")
+
+    @pytest.mark.asyncio
+    async def test_user_timestamps_consistent(self, test_db, async_client):
+        """Test register, login and /me report the same stored timestamps."""
+        register_response = await async_client.post("/api/v1/auth/register", json=SHARED_USER)
+        registered = jload(register_response)["data"]["user"]
+        token = jload(register_response)["data"]["token"]
+
+        login_response = await async_client.post("/api/v1/auth/login", json=SHARED_LOGIN)
+        logged_in = jload(login_response)["data"]["user"]
+
+        headers = {"Authorization": f"Bearer {token}"}
+        me = jload(await async_client.get("/api/v1/auth/me", headers=headers))["data"]
+
+        assert registered["created_at"] == logged_in["created_at"] == me["created_at"]
+        assert logged_in["last_login_at"] == me["last_login_at"]
+
+    def test_timestamps_set_by_app(self, test_db):
+        """Test created/updated timestamps are filled in on insert without a reload."""
+        async def create():
+            async with TestingSessionLocal() as db:
+                user = User(external_id="user_stamp", email="appstamp@example.com", username="appstamp")
+                db.add(user)
+                await db.commit()
+                # Not expired after the INSERT, so reading it issues no SQL
+                return user.created_at, user.updated_at
+
+        created_at, updated_at = asyncio.run(create())
+        assert created_at is not None and created_at.microsecond == 0
+        assert updated_at is not None
+
+    @pytest.mark.asyncio
+    async def test_get_current_user_invalid_token(self, test_db, async_client):
         """Test getting current user with invalid token."""
-        headers = {"Authorization": "Bearer invalid_token"}
-        response = client.get("/api/v1/auth/me", headers=headers)
+        headers = INVALID_TOKEN_HEADERS
+        response = await async_client.get("/api/v1/auth/me", headers=headers)
         
         assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_get_current_user_missing_token(self, test_db, async_client):
+        """Test getting current user without a bearer token."""
+        response = await async_client.get("/api/v1/auth/me")
+        assert response.status_code == 401
+
+        response = await async_client.get("/api/v1/auth/me", headers={"Authorization": "Basic abc"})
+        assert response.status_code == 401
     
-    def test_logout(self, test_db):
+    @pytest.mark.asyncio
+    async def test_logout(self, test_db, async_client):
         """Test logout endpoint."""
-        response = client.post("/api/v1/auth/logout")
+        response = await async_client.post("/api/v1/auth/logout")
         
         assert response.status_code == 200
-        data = response.json()
+        data = jload(response)
         assert data["success"] is True
         assert "Logout successful" in data["message"]
 
+    @pytest.mark.asyncio
+    async def test_get_current_user_cached(self, test_db, async_client):
+        """Test repeated /me calls are served from the token and user caches."""
+        user_id, token, headers = make_user()
+
+        first = await async_client.get("/api/v1/auth/me", headers=headers)
+        assert first.status_code == 200
+        assert token_digest(token) in token_payload_cache
+        assert user_id in user_snapshot_cache
+
+        # Served from the snapshot even though the row is gone
+        db = SyncSessionLocal()
+        try:
+            db.query(User).filter(User.id == user_id).delete()
+            db.commit()
+        finally:
+            db.close()
+
+        second = await async_client.get("/api/v1/auth/me", headers=headers)
+        assert second.status_code == 200
+        assert jload(second)["data"] == jload(first)["data"]
+
+    @pytest.mark.asyncio
+    async def test_login_invalidates_user_snapshot(self, test_db, async_client):
+        """Test login drops the cached user so /me sees the new last_login_at."""
+        user_id, _, headers = make_user()
+
+        await async_client.get("/api/v1/auth/me", headers=headers)
+        assert user_id in user_snapshot_cache
+
+        await async_client.post("/api/v1/auth/login", json=SHARED_LOGIN)
+        assert user_id not in user_snapshot_cache
+
+    @pytest.mark.asyncio
+    async def test_logout_revokes_token(self, test_db, async_client):
+        """Test a token presented at logout is rejected afterwards."""
+        user_id, token, headers = make_user()
+
+        assert (await async_client.get("/api/v1/auth/me", headers=headers)).status_code == 200
+
+        response = await async_client.post("/api/v1/auth/logout", headers=headers)
+        assert response.status_code == 200
+        assert token_digest(token) in revoked_tokens
+        assert token_digest(token) not in token_payload_cache
+        assert user_id not in user_snapshot_cache
+
+        response = await async_client.get("/api/v1/auth/me", headers=headers)
+        assert response.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_logout_ignores_invalid_token(self, test_db, async_client):
+        """Test logout with an invalid token does not grow the denylist."""
+        headers = INVALID_TOKEN_HEADERS
+        response = await async_client.post("/api/v1/auth/logout", headers=headers)
+
+        assert response.status_code == 200
+        assert len(revoked_tokens) == 0
+
+    def test_record_session_batches_answers(self, test_db):
+        """Test a completed session is stored with one INSERT for all answers."""
+        completion = SessionComplete(
+            words_count=3,
+            correct_count=2,
+            duration_seconds=60,
+            answers=[
+                {"word_id": word_id, "is_correct": word_id != "cat"}
+                for word_id in ("apple", "banana", "cat")
+            ],
+        )
+
+        async def record():
+            async with TestingSessionLocal() as db:
+                return await ProgressService(stats_cache=None).record_session(
+                    db, 1, "flashcard", completion
+                )
+
+        with count_queries(engine.sync_engine) as queries:
+            session_id = asyncio.run(record())
+        answer_inserts = [q for q in queries if q.startswith("INSERT INTO session_answers")]
+        assert len(answer_inserts) == 1
+
+        db = SyncSessionLocal()
+        try:
+            session = db.get(DBSession, session_id)
+            assert float(session.accuracy) == 66.7
+            answers = db.query(SessionAnswer).filter(SessionAnswer.session_id == session_id).all()
+            assert sorted(answer.word_id for answer in answers) == ["apple", "banana", "cat"]
+        finally:
+            db.close()
+
+    def test_record_session_schedules_words(self, test_db):
+        """Test answered words get their SM-2 state updated in one batch."""
+        db = SyncSessionLocal()
+        try:
+            db.add(UserWord(
+                user_id=1, word_id="apple", repetitions=2, ease_factor=2.5,
+                mastery_level=1.0, seen_count=2, correct_count=2
+            ))
+            db.commit()
+        finally:
+            db.close()
+
+        completion = SessionComplete(
+            words_count=2,
+            correct_count=1,
+            duration_seconds=30,
+            answers=[
+                {"word_id": "apple", "is_correct": True, "quality_score": 5},
+                {"word_id": "cat", "is_correct": False},
+            ],
+        )
+
+        async def record():
+            async with TestingSessionLocal() as db:
+                await ProgressService(stats_cache=None).record_session(
+                    db, 1, "flashcard", completion
+                )
+
+        with count_queries(engine.sync_engine) as queries:
+            asyncio.run(record())
+        assert len([q for q in queries if q.startswith("UPDATE user_words")]) == 1
+
+        today = date.today()
+        db = SyncSessionLocal()
+        try:
+            apple = db.get(UserWord, (1, "apple"))
+            assert (apple.repetitions, apple.ease_factor, apple.mastery_level) == (3, 2.6, 1.7)
+            assert apple.next_review == today + timedelta(days=16)
+            assert (apple.seen_count, apple.correct_count) == (3, 3)
+
+            cat = db.get(UserWord, (1, "cat"))
+            assert (cat.repetitions, cat.ease_factor, cat.mastery_level) == (0, 2.0, 0.0)
+            assert cat.next_review == today + timedelta(days=1)
+            assert (cat.seen_count, cat.correct_count) == (1, 0)
+        finally:
+            db.close()
+
+    def test_sync_progress_looks_up_words_once(self, test_db):
+        """Test a sync reads all existing words in one query and writes in bulk."""
+        db = SyncSessionLocal()
+        try:
+            db.add_all([
+                UserWord(user_id=1, word_id="apple", repetitions=2, mastery_level=1.0),
+                UserWord(user_id=1, word_id="pear", repetitions=1, mastery_level=0.7),
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+        sync_data = ProgressSyncData(words=[
+            {"word_id": "apple", "mastery_level": 2.0, "repetitions": 3, "ease_factor": 2.6},
+            {"word_id": "cat", "mastery_level": 0.5},
+            {"word_id": "dog"},
+            # Same state as stored: not a conflict
+            {"word_id": "pear", "mastery_level": 0.7, "repetitions": 1},
+        ])
+
+        async def sync():
+            async with TestingSessionLocal() as db:
+                return await ProgressService(stats_cache=None).sync_user_progress(db, 1, sync_data)
+
+        with count_queries(engine.sync_engine) as queries:
+            result = asyncio.run(sync())
+        assert len([q for q in queries if q.startswith("SELECT")]) == 1
+        # New and existing words go through one upsert
+        assert len([q for q in queries if q.startswith(("INSERT", "UPDATE"))]) == 1
+        assert result["updated_words"] == 4
+        assert result["conflicts"] == [
+            {"word_id": "apple", "server_mastery": 1.0, "client_mastery": 2.0, "resolution": "client_wins"}
+        ]
+
+        db = SyncSessionLocal()
+        try:
+            apple = db.get(UserWord, (1, "apple"))
+            assert (apple.mastery_level, apple.repetitions, apple.ease_factor) == (2.0, 3, 2.6)
+            assert db.get(UserWord, (1, "cat")).mastery_level == 0.5
+            assert db.query(UserWord).count() == 4
+        finally:
+            db.close()
+
+    @pytest.mark.asyncio
+    async def test_progress_summary_query_count(self, test_db):
+        """Test the progress summary costs three queries however much data there is."""
+        user_id = make_user(username="summaryuser", email="summary@example.com").id
+
+        db = SyncSessionLocal()
+        try:
+            db.add_all([
+                UserWord(user_id=user_id, word_id=f"word{i}", mastery_level=2.5, ease_factor=2.8)
+                for i in range(20)
+            ])
+            db.add_all([
+                DBSession(user_id=user_id, practice_type="flashcard", words_count=5, correct_count=4)
+                for _ in range(5)
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+        async def summary():
+            async with TestingSessionLocal() as db:
+                return await ProgressService(stats_cache=None).get_user_progress_summary(db, user_id)
+
+        with count_queries(engine.sync_engine) as queries:
+            result = await summary()
+        assert len(queries) == 3
+        assert result["user"]["username"] == "summaryuser"
+        assert len(result["words"]) == 20
+        assert (result["words"][0]["mastery_level"], result["words"][0]["ease_factor"]) == (2.5, 2.8)
+        assert len(result["sessions"]) == 5
+
+        # Datetimes are left for the response class to serialize
+        body = UTCJSONResponse(result).body
+        assert b'"started_at":"' in body and b'"last_review":null' in body
+
+    def test_reschedule_reviews(self, test_db):
+        """Test the nightly job fixes due dates tile by tile and leaves correct ones alone."""
+        last_review = date(2024, 3, 1)
+        db = SyncSessionLocal()
+        try:
+            db.add_all([
+                User(external_id=f"user_{i}", email=f"tile{i}@example.com", username=f"tile{i}")
+                for i in range(3)
+            ])
+            db.flush()
+            user_ids = [user.id for user in db.query(User).order_by(User.id)]
+            db.add_all([
+                # Two passes: due 6 days later, stored wrong
+                UserWord(user_id=user_ids[0], word_id="apple", repetitions=2, ease_factor=2.5,
+                         last_review=last_review, next_review=last_review),
+                # Lapse: due the next day, already correct
+                UserWord(user_id=user_ids[1], word_id="cat", repetitions=0, ease_factor=2.0,
+                         last_review=last_review, next_review=last_review + timedelta(days=1)),
+                # Fourth pass: ceil(6 * 2.5^2) = 38 days, stored wrong
+                UserWord(user_id=user_ids[2], word_id="dog", repetitions=4, ease_factor=2.5,
+                         last_review=last_review, next_review=None),
+                # Never reviewed: left alone
+                UserWord(user_id=user_ids[2], word_id="egg", repetitions=0),
+            ])
+            db.commit()
+        finally:
+            db.close()
+
+        changed = asyncio.run(reschedule_reviews(TestingSessionLocal, tile_size=2))
+        assert changed == 2
+
+        db = SyncSessionLocal()
+        try:
+            due = {word.word_id: word.next_review for word in db.query(UserWord)}
+            assert due == {
+                "apple": last_review + timedelta(days=6),
+                "cat": last_review + timedelta(days=1),
+                "dog": last_review + timedelta(days=38),
+                "egg": None,
+            }
+        finally:
+            db.close()
+
+    @pytest.mark.asyncio
+    async def test_event_data_round_trip(self, test_db, async_client):
+        """Test event payloads are stored as bytes and read back as dicts."""
+        await async_client.post("/api/v1/auth/register", json={
+            "username": "eventuser",
+            "email": "event@example.com",
+            "password": "eventpassword123",
+            "grade": "grade6"
+        })
+        # Events are queued by the request and written by the flusher
+        assert await event_logger.flush(TestingSessionLocal) == 1
+
+        db = SyncSessionLocal()
+        try:
+            event = db.query(Event).filter(Event.event_type == "registration").one()
+            assert isinstance(event.event_payload, bytes)
+            assert event.event_data["method"] == "email"
+        finally:
+            db.close()
+
+    def test_intern_user_agent(self, test_db):
+        """Test a User-Agent string is stored once and reused by id."""
+        async def intern_twice():
+            async with TestingSessionLocal() as db:
+                first = await intern_user_agent(db, "Mozilla/5.0 (test)")
+                await db.commit()
+            async with TestingSessionLocal() as db:
+                second = await intern_user_agent(db, "Mozilla/5.0 (test)")
+            return first, second
+
+        user_agent_ids.clear()
+        first, second = asyncio.run(intern_twice())
+        assert first == second
+
+        db = SyncSessionLocal()
+        try:
+            assert db.query(UserAgent).count() == 1
+        finally:
+            db.close()
+
+    def test_parse_client_timestamps(self):
+        """Test imported ISO 8601 values parse with or without a Z suffix."""
+        service = ProgressService(stats_cache=None)
+        assert service._parse_date("2024-03-01") == date(2024, 3, 1)
+        assert service._parse_date("2024-03-01T10:00:00Z") == date(2024, 3, 1)
+        parsed = service._parse_datetime("2024-03-01T10:00:00.5Z")
+        assert (parsed.hour, parsed.microsecond, parsed.utcoffset()) == (10, 500000, timedelta(0))
+        assert service._parse_datetime("yesterday") is None
+
+    def test_validate_words(self):
+        """Test raw word progress JSON is validated through the shared adapter."""
+        words = validate_words(b'[{"word_id": "apple", "mastery_level": 2.5}]')
+        assert words[0].word_id == "apple"
+        assert words[0].ease_factor == 2.5
+
+        with pytest.raises(ValidationError):
+            validate_words(b'[{"word_id": "apple", "mastery_level": 9}]')
+        # Word ids are stored as ASCII
+        with pytest.raises(ValidationError):
+            validate_words('[{"word_id": "苹果"}]'.encode())
+
+    def test_schedule_loop_matches_vectorized(self):
+        """Test the per-word scheduling loop (numba kernel source) agrees with NumPy."""
+        rng = np.random.default_rng(0)
+        n = 1000
+        args = (
+            rng.integers(0, 10, n),
+            rng.integers(13, 51, n) / 10,
+            rng.integers(0, 51, n) / 10,
+            rng.integers(0, 6, n),
+            rng.integers(0, 8000, n),
+        )
+        expected = schedule_reviews(*args)
+        actual = Schedule(np.empty(n, np.int64), np.empty(n), np.empty(n), np.empty(n, np.int64))
+        _schedule_loop(*args, *actual)
+
+        for field in Schedule._fields:
+            np.testing.assert_allclose(getattr(actual, field), getattr(expected, field))
+
+    def test_review_due_query_uses_index_order(self, test_db):
+        """Test the review-due query is an index range scan with no sort step."""
+        plan = query_plan(REVIEW_DUE_QUERY, user_id=1, today=date.today(), limit=20)
+        assert any("USING INDEX idx_user_words_review_cov" in step for step in plan)
+        assert not any("TEMP B-TREE" in step for step in plan)
+
+    def test_recent_sessions_query_uses_index_order(self, test_db):
+        """Test this month's sessions come newest first straight from idx_user_date."""
+        plan = query_plan(RECENT_SESSIONS_QUERY, user_id=1, since=date.today().replace(day=1))
+        assert any("USING INDEX idx_user_date" in step for step in plan)
+        assert not any("TEMP B-TREE" in step for step in plan)
+
+    def test_no_redundant_indexes(self):
+        """Test no index is a left prefix of another key on the same table."""
+        for table in Base.metadata.tables.values():
+            keys = [(index.name, tuple(c.name for c in index.columns)) for index in table.indexes]
+            keys += [
+                (constraint.name or "unique", tuple(c.name for c in constraint.columns))
+                for constraint in table.constraints
+                if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint))
+            ]
+            keys += [("unique", (c.name,)) for c in table.columns if c.unique]
+
+            for index in table.indexes:
+                if index.unique:
+                    continue
+                columns = tuple(c.name for c in index.columns)
+                for name, other in keys:
+                    if name != index.name and other[:len(columns)] == columns:
+                        pytest.fail(f"{table.name}.{index.name} is a prefix of {name} {other}")
+
 
 if __name__ == "__main__":
     pytest.main([__file__])